@@ -1,14 +1,8 @@
 # config.py
 from pathlib import Path
-from dotenv import load_dotenv
 from decimal import Decimal
-# point explicitly at your .env file (in the same dir as config.py)
-env_path = Path(__file__).parent / ".env"
-load_dotenv(dotenv_path=env_path)
-import os
-MODE = os.getenv("MODE", "LIVE") 
-
-from constants import LOG_PATH, SYMBOLS, POLL_INTERVAL, RISK_FRAC
+from settings import SETTINGS
+MODE = SETTINGS.MODE
 
 #print("ENV LOADED:", dict(
     #API_KEY=os.getenv("API_KEY"),
@@ -16,10 +10,10 @@ from constants import LOG_PATH, SYMBOLS, POLL_INTERVAL, RISK_FRAC
     #GIT_PAT = os.getenv("GIT_PAT")
 #))
 
-API_KEY = os.getenv("API_KEY")
-API_SECRET = os.getenv("API_SECRET")
-KRAKEN_FUTURES_API = os.getenv("KRAKEN_FUTURES_API")
-KRAKEN_FUTURES_SECRET = os.getenv("KRAKEN_FUTURES_SECRET")
+API_KEY = SETTINGS.API_KEY
+API_SECRET = SETTINGS.API_SECRET
+KRAKEN_FUTURES_API = SETTINGS.KRAKEN_FUTURES_API
+KRAKEN_FUTURES_SECRET = SETTINGS.KRAKEN_FUTURES_SECRET
 #GIT_PAT = os.getenv("GIT_PAT")
 
 
@@ -32,6 +26,7 @@ SYMBOLS       = [
     "DOGE/USD", "TIA/USD", "FARTCOIN/USD", "GHIBLI/USD",
     "BAL/USD", "LOFI/USD", "ZEC/USD", "ELX/USD", "BODEN/USD"
 ]
+BASE_ASSET    = {s: s.split("/")[0] for s in SYMBOLS}   # "SOL/USD" → "SOL", split once
 DIP_THRESHOLD = 0.98    # deeper pullbacks only
 EMA_PERIOD    = 20      # 20‑hour EMA
 ATR_PERIOD    = 14      # 14 × 1‑min bars
@@ -40,7 +35,18 @@ SL_ATR_MULT   = Decimal("1.5")     # stop loss: 1.5× ATR
 TRAIL_PCT     = 1.0     # 1 % trailing stop
 RISK_FRAC     = Decimal("0.12")    # 2 % of equity per entry
 MAX_OPEN      = 2
-POLL_INTERVAL = 30      # seconds
+POLL_INTERVAL = 30      # seconds at the reference volatility below
+POLL_VOL_REF  = 0.001   # 1‑min ATR / price that maps to POLL_INTERVAL
+POLL_MIN      = 5       # adaptive sleep clamp (seconds)
+POLL_MAX      = 120
+MARKETS_TTL   = 3600    # seconds between load_markets() refreshes
+PRICE_BUCKETS = 1       # REST tickers: refresh 1/N of the symbols per cycle
+MAX_STALENESS = 300     # seconds; older cached prices are left out of the cycle
+BALANCE_TTL   = 5       # seconds a fetched balance is reused by callers without one
+BALANCE_MAX_AGE = 300   # cap on reusing a balance while the WS account feed shows no change
+ORDER_CONCURRENCY = 1   # parallel create_order calls; >1 needs a nonce window on the API key
+RATE_LIMIT_MS = 500     # spacing between public REST calls (ccxt's kraken default is 1000)
+KRAKEN_TIER   = "intermediate"   # starter / intermediate / pro – sets the private API-counter model
 MIN_USD_EXPOS = 10      # adopt only positions ≥ $10
 MIN_24H_VOL   = 50_000  # minimum $50 k of daily volume
 MIN_BOOK_UNITS= 50      # min base‑asset units in top book
@@ -50,5 +56,17 @@ MIN_ORDER_USD = Decimal("3")	# skip any pair whose minlot x price < MIN_ORDER_US
 # Paths (NAS share)
 MOUNT_DIR = Path("/mnt/bot-log-share")
 MOUNT_DIR.mkdir(parents=True, exist_ok=True)
-TRADE_CSV = MOUNT_DIR / "kraken-trades.csv"
-LOG_PATH  = MOUNT_DIR / "kraken-bot.log"
+STATE_TTL   = 24 * 3600                                # seconds a saved state is trusted on boot
+
+# Local disk for the files written from the trading and logging threads;
+# nas_mirror copies them to the share
+LOCAL_DIR = Path("/var/tmp/kraken-bot")
+LOCAL_DIR.mkdir(parents=True, exist_ok=True)
+TRADE_CSV   = LOCAL_DIR / "kraken-trades.csv"
+TRADE_STATE = LOCAL_DIR / "kraken-trades.state.json"   # CSV high-water mark
+BOT_STATE   = LOCAL_DIR / "kraken-bot.state.json"      # positions / trailing peaks across restarts
+LOG_PATH    = LOCAL_DIR / "kraken-bot.log"
+INVENTORY_DIR     = LOCAL_DIR       # inventory_<symbol>.json FIFO checkpoints
+# a download cache – not mirrored, a fresh host simply fetches markets again
+MARKETS_CACHE_DIR = LOCAL_DIR       # <exchange id>-markets.json, reused for MARKETS_TTL
+MIRROR_INTERVAL = 60                # seconds between copies to MOUNT_DIR
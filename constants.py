@@ -1,5 +0,0 @@
-# constants.py
-LOG_PATH = "/mnt/bot-log-share/kraken-bot.log"
-SYMBOLS  = [...]
-POLL_INTERVAL = 60
-RISK_FRAC = 0.005
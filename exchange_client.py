@@ -1,37 +1,95 @@
-import os, logging, ccxt
+import functools, heapq, json, math, os, socket, threading, time, logging, ccxt
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from decimal import Decimal
-from dotenv import load_dotenv
-from config import MODE, API_KEY, API_SECRET, KRAKEN_FUTURES_API, KRAKEN_FUTURES_SECRET
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from config import SYMBOLS, MODE, API_KEY, API_SECRET, KRAKEN_FUTURES_API, KRAKEN_FUTURES_SECRET, MARKETS_TTL, MARKETS_CACHE_DIR, INVENTORY_DIR, BALANCE_TTL, BALANCE_MAX_AGE, RATE_LIMIT_MS, KRAKEN_TIER
 from ccxt.base.errors import BadSymbol, ExchangeError   # already used in option-3 patch
 from symbol_map import map_sym                          # ← NEW
+import ws_cache
 
 logger = logging.getLogger(__name__)
 
-# Load environment
-load_dotenv()
-API_KEY = os.getenv("API_KEY")
-API_SECRET = os.getenv("API_SECRET")
-KRAKEN_FUTURES_API = os.getenv("KRAKEN_FUTURES_API")
-KRAKEN_FUTURES_SECRET = os.getenv("KRAKEN_FUTURES_SECRET")
-
-# Initialize CCXT exchange
-if MODE=="SIM":
-    exchange = ccxt.krakenfutures({
-        "apiKey": KRAKEN_FUTURES_API,
-        "secret": KRAKEN_FUTURES_SECRET,
-        "enableRateLimit": True,
-        "timeout": 60000,
-    })
+# ─── HTTP SESSION ─────────────────────────────────────────────────────────
+# One keep-alive session shared by every REST call, so the TCP + TLS
+# handshake is paid once per connection instead of once per request.
+# TCP keepalive probes stop a NAT or firewall in front of the bot from
+# silently dropping pooled connections while the loop sleeps.
+_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+] + [
+    (socket.IPPROTO_TCP, opt, val)
+    for name, val in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+    if (opt := getattr(socket, name, None)) is not None
+]
 
-else:
-    exchange = ccxt.kraken({
-        "apiKey": API_KEY,
-        "secret": API_SECRET,
-        "enableRateLimit": True,
-        "timeout": 60000,
-    })
-exchange.load_markets()
-logger.info("Loaded %d markets", len(exchange.markets))
+
+class _KeepAliveAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = _SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _make_session() -> requests.Session:
+    session = requests.Session()
+    session.mount("https://", _KeepAliveAdapter(pool_connections=4, pool_maxsize=16))
+    return session
+
+
+_SESSION = _make_session()
+
+# Public calls may overlap with the (strictly serial) private ones: Kraken
+# rejects private requests whose nonces arrive out of order, so only
+# unsigned requests are ever submitted here.
+PUBLIC_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kraken-public")
+
+
+# ─── RATE LIMITING ────────────────────────────────────────────────────────
+# Kraken's REST API counter per verification tier: (max, decay per second)
+_TIER_COUNTER = {"starter": (15, 0.33), "intermediate": (20, 0.5), "pro": (20, 1.0)}
+
+
+class _KrakenThrottle:
+    """
+    Drop-in for ccxt's Exchange.throttle(cost) on the spot client.
+
+    ccxt's own throttle spaces *every* request by rateLimit × cost since the
+    last one, so a TradesHistory page (cost 6) waits 6 s even on an idle
+    key.  Here private calls are charged to a model of Kraken's API counter
+    instead (ccxt's kraken costs are 3 per counter point) and only wait
+    once it would overflow the tier maximum; public calls keep the
+    rateLimit spacing on their own clock, and order calls (cost 0) never
+    wait.  Thread-safe – public prefetches run on PUBLIC_POOL.
+    """
+
+    def __init__(self, rate_limit_ms: float, tier: str):
+        self._spacing = rate_limit_ms / 1000
+        self._max, self._decay = _TIER_COUNTER[tier]
+        self._count = 0.0
+        self._count_ts = time.monotonic()
+        self._public_next = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, cost=None):
+        cost = 1 if cost is None else cost
+        if not cost:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if cost >= 3:                    # private endpoint
+                self._count = max(0.0, self._count - (now - self._count_ts) * self._decay)
+                self._count_ts = now
+                self._count += cost / 3
+                wait = max(0.0, (self._count - self._max) / self._decay)
+            else:
+                start = max(now, self._public_next)
+                self._public_next = start + self._spacing * cost
+                wait = start - now
+        if wait > 0:
+            time.sleep(wait)
 
 
 # ─── FACTORY ──────────────────────────────────────────────────────────────
@@ -41,74 +99,475 @@ def _make_exchange():
             "apiKey": KRAKEN_FUTURES_API,
             "secret": KRAKEN_FUTURES_SECRET,
             "enableRateLimit": True,
+            "timeout": 60000,
+            "session": _SESSION,
         })
         ex.set_sandbox_mode(True)          # <-- key line
         logger.info("🔧 DEMO Futures sandbox enabled")
         return ex
 
-    elif MODE == "SIM":
-        from sim_exchange import SimExchange   # your own stub (option 3)
-        return SimExchange()
-
     # default: live spot
-    return ccxt.kraken({
+    ex = ccxt.kraken({
         "apiKey": API_KEY,
         "secret": API_SECRET,
         "enableRateLimit": True,
+        "rateLimit": RATE_LIMIT_MS,
+        "timeout": 60000,
+        "session": _SESSION,
     })
+    ex.throttle = _KrakenThrottle(RATE_LIMIT_MS, KRAKEN_TIER)
+    return ex
+
+
+def write_atomic(path, text: str) -> None:
+    """Write via a temp file + os.replace so a crash never leaves half a file."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+@functools.lru_cache(maxsize=4096)
+def to_decimal(x: float) -> Decimal:
+    """
+    Exact Decimal of a float price/amount, memoized: quotes and balances
+    repeat from cycle to cycle, and the string round-trip is ~5× the lookup.
+    """
+    return Decimal(repr(float(x)))
+
+
+def _load_markets(ex, reload: bool = False) -> None:
+    """
+    load_markets() through an on-disk JSON cache.
+
+    A cache file younger than MARKETS_TTL is used as-is, so warm restarts
+    skip the markets download entirely; otherwise markets are fetched and
+    the file is rewritten.
+    """
+    path = MARKETS_CACHE_DIR / f"{ex.id}-markets.json"
+    if not reload:
+        try:
+            if time.time() - path.stat().st_mtime < MARKETS_TTL:
+                cached = json.loads(path.read_text())
+                ex.set_markets(cached["markets"], cached["currencies"])
+                logger.info("Loaded %d markets from %s", len(ex.markets), path)
+                return
+        except (OSError, ValueError, KeyError):
+            pass                           # missing/corrupt cache → fetch below
+    ex.load_markets(reload=reload)
+    logger.info("Loaded %d markets", len(ex.markets))
+    try:
+        write_atomic(path, json.dumps({"markets": ex.markets, "currencies": ex.currencies}))
+    except (OSError, TypeError) as exc:
+        logger.warning("Could not cache markets to %s: %s", path, exc)
+
 
 exchange = _make_exchange()
-exchange.load_markets()
-logger.info("Loaded %d markets", len(exchange.markets))
 
 
+def shutdown() -> None:
+    """Stop the public pool (dropping queued prefetches) and close pooled connections."""
+    PUBLIC_POOL.shutdown(wait=False, cancel_futures=True)
+    _SESSION.close()
+
+
+# ─── MARKET SNAPSHOTS ─────────────────────────────────────────────────────
+# Flat per-symbol views of exchange.markets, so hot paths read slot
+# attributes instead of walking market["limits"]["amount"]["min"] each time.
+# Updated in place, so `from exchange_client import SYM_META` stays valid.
+@dataclass(slots=True)
+class SymMeta:
+    base: str
+    market_id: str              # the exchange's own pair id, e.g. "XBTUSD"
+    active: bool
+    min_lot: Decimal            # never 0: floored at _MIN_LOT_FLOOR
+    min_lot_f: float            # same, for the float / numpy screens
+    price_precision: float | None
+    amount_precision: float | None
+    price_dp: int | None        # decimals of a power-of-ten price tick, else None
+
+
+SYM_META: dict[str, SymMeta] = {}
+_markets_loaded_at = 0.0
+
+
+_MIN_LOT_FLOOR = Decimal("1e-8")
+
+
+def _min_lot(market: dict) -> Decimal:
+    # Kraken spot sends ordermin as a string – parse it directly
+    raw = market.get("info", {}).get("ordermin")
+    if isinstance(raw, str):
+        lot = Decimal(raw)
+    else:
+        lot = Decimal(str(market["limits"]["amount"]["min"] or 0))
+    return lot or _MIN_LOT_FLOOR
+
+
+def _decimals(tick: float | None) -> int | None:
+    # 0.01 → 2; ticks like 0.5 or 25 can't be expressed as a decimal count
+    if not tick:
+        return None
+    dp = -math.log10(tick)
+    places = round(dp)
+    return places if places >= 0 and abs(dp - places) < 1e-9 else None
+
+
+def _last_price(ticker: dict) -> float:
+    # prices stay float through the loop; Decimal only at the order boundary
+    return float(ticker.get("last") or 0)
+
+
+def _snapshot_markets() -> None:
+    # only the traded universe – not the thousands of other pairs
+    global _markets_loaded_at
+    markets = exchange.markets
+    meta = {
+        s: SymMeta(
+            base=m["base"],
+            market_id=m["id"],
+            active=bool(m.get("active", False)),
+            min_lot=(lot := _min_lot(m)),
+            min_lot_f=float(lot),
+            price_precision=(m.get("precision") or {}).get("price"),
+            amount_precision=(m.get("precision") or {}).get("amount"),
+            price_dp=_decimals((m.get("precision") or {}).get("price")),
+        )
+        for s in SYMBOLS
+        if (m := markets.get(s)) is not None
+    }
+    SYM_META.clear()
+    SYM_META.update(meta)
+    _markets_loaded_at = time.monotonic()
+
+
+# ─── BACKGROUND MARKETS LOAD ──────────────────────────────────────────────
+# load_markets() runs in a daemon thread started at import, so the rest of
+# start-up (other imports, the WS feed) proceeds while it downloads.  Every
+# function that needs markets (ccxt's private calls load them implicitly)
+# waits on _markets_ready first.
+_markets_ready = threading.Event()
+
+
+def _prefetch_markets() -> None:
+    try:
+        _load_markets(exchange)
+        _snapshot_markets()
+    except Exception as exc:
+        logger.error("Background load_markets failed: %s", exc)
+    finally:
+        _markets_ready.set()
+
+
+def wait_markets() -> None:
+    """Block until the start-up markets load is done (retrying inline if it failed)."""
+    _markets_ready.wait()
+    if not _markets_loaded_at:
+        _load_markets(exchange)
+        _snapshot_markets()
+
+
+def _needs_markets(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        wait_markets()
+        return fn(*args, **kwargs)
+    return wrapper
 
-def fetch_price(symbol: str) -> Decimal | None:
+
+threading.Thread(target=_prefetch_markets, name="load-markets", daemon=True).start()
+
+
+def _mark_inactive(symbol: str) -> None:
+    # the exchange rejected a symbol the snapshot still lists as active:
+    # keep it out of the filter until the next refresh_markets() decides
+    meta = SYM_META.get(symbol)
+    if meta is not None and meta.active:
+        meta.active = False
+        logger.warning("%s marked inactive until the next markets refresh", symbol)
+
+
+@_needs_markets
+def refresh_markets(max_age: float = MARKETS_TTL) -> bool:
+    """Reload markets (and the snapshots above) once they are older than max_age; True if reloaded."""
+    if time.monotonic() - _markets_loaded_at < max_age:
+        return False
+    _load_markets(exchange, reload=True)
+    _snapshot_markets()
+    return True
+
+
+@_needs_markets
+def live_symbols(symbols: list[str]) -> list[str]:
+    """`symbols` minus the ones the markets snapshot lists as inactive or missing."""
+    return [
+        s for s in symbols
+        if (meta := SYM_META.get(s)) is not None and meta.active
+    ]
+
+
+
+# concurrent single-ticker calls when a batched fetch_tickers fails
+_FALLBACK_WORKERS = 4
+
+# this cycle's price snapshot; fetch_price() answers from it so helpers
+# called later in the cycle don't re-request a ticker the loop already has.
+# The snapshot belongs to the caller and is only read; REST misses go to
+# _rest_prices, which is ours and starts empty every cycle.
+_cycle_prices: dict[str, float] = {}
+_rest_prices: dict[str, float] = {}
+
+
+def use_cycle_prices(prices: dict[str, float]) -> None:
+    """Install the cycle's price snapshot as fetch_price()'s memo (replaces the last one)."""
+    global _cycle_prices, _rest_prices
+    _cycle_prices = prices
+    _rest_prices = {}
+
+
+@_needs_markets
+def fetch_price(symbol: str) -> float | None:
     """Return the last traded price, or None if the symbol is unsupported/unavailable."""
-         # ← translate BTC/USD → PI_XBTUSD, etc.
-    fut_sym = map_sym(symbol)    
+    cached = ws_cache.price(symbol)          # pushed by the WS feed, no round-trip
+    if cached is None:
+        cached = _cycle_prices.get(symbol)
+    if cached is None:
+        cached = _rest_prices.get(symbol)
+    if cached is not None:
+        return cached
+    px = _fetch_ticker_price(symbol)
+    if px is not None:
+        _rest_prices[symbol] = px
+    return px
+
+
+def _fetch_ticker_price(symbol: str) -> float | None:
+    # one REST ticker, no memo – the fetch_prices fallback must not be
+    # answered from the snapshot it is meant to refresh
+    fut_sym = map_sym(symbol)    # ← translate BTC/USD → PI_XBTUSD, etc.
     try:
-        ticker = exchange.fetch_ticker(fut_sym)
-        return Decimal(ticker.get("last") or 0)
+        return _last_price(exchange.fetch_ticker(fut_sym))
     except BadSymbol:
         logger.warning("%s unsupported on %s – skipping", symbol, exchange.id)
+        _mark_inactive(symbol)
         return None
     except ExchangeError as exc:
         logger.error("fetch_ticker(%s) failed: %s", fut_sym, exc)
         return None
 
 
-def account_cash() -> Decimal:
-    """Get free USD cash balance, with logging."""
-    logger.info("account_cash called")
+@_needs_markets
+def fetch_prices(symbols: list[str]) -> dict[str, float]:
+    """
+    Last price for many symbols with at most one REST request.
+
+    Symbols the WS feed already knows are served from memory; the rest go
+    through a single fetch_tickers() call.  Symbols without a price are
+    left out of the result.
+    """
+    prices: dict[str, float] = {}
+    missing: list[str] = []
+    for sym in symbols:
+        cached = ws_cache.price(sym)
+        if cached is not None:
+            prices[sym] = cached
+        elif (meta := SYM_META.get(sym)) is None or meta.active:
+            missing.append(sym)
+        # a pair marked inactive after a BadSymbol would fail the whole
+        # batch again – it stays out until the next markets refresh
+    if not missing:
+        return prices
+
+    by_market = {map_sym(sym): sym for sym in missing}
+    try:
+        fetched = _fetch_last_prices(by_market)
+    except (BadSymbol, ExchangeError) as exc:
+        # one bad pair fails the whole batch – fall back to per-symbol calls,
+        # overlapped (they are public); a pool of its own, since this may
+        # already be running on PUBLIC_POOL
+        logger.warning("fetch_tickers failed (%s) – falling back to fetch_ticker", exc)
+        with ThreadPoolExecutor(max_workers=_FALLBACK_WORKERS) as pool:
+            for sym, p in zip(missing, pool.map(_fetch_ticker_price, missing)):
+                if p is not None:
+                    prices[sym] = p
+        return prices
+
+    prices.update(fetched)
+    return prices
+
+
+def _fetch_last_prices(by_market: dict[str, str]) -> dict[str, float]:
+    # {market symbol: our symbol} → {our symbol: last price}, one request
+    if exchange.id != "kraken":
+        tickers = exchange.fetch_tickers(list(by_market))
+        return {
+            by_market[m]: _last_price(t) for m, t in tickers.items() if m in by_market
+        }
+    # spot: the raw Ticker endpoint, reading only the last-trade field – the
+    # bot never uses the rest of ccxt's parse_ticker (~25 µs of string
+    # arithmetic per pair and cycle)
+    ids = {
+        meta.market_id if (meta := SYM_META.get(sym)) else exchange.market(m)["id"]: sym
+        for m, sym in by_market.items()
+    }
+    response = exchange.publicGetTicker({"pair": ",".join(ids)})
+    out: dict[str, float] = {}
+    for market_id, raw in (response.get("result") or {}).items():
+        sym = ids.get(market_id) or by_market.get(exchange.safe_market(market_id)["symbol"])
+        if sym is not None:
+            out[sym] = float((raw.get("c") or (0,))[0] or 0)
+    return out
+
+
+def price_to_precision(symbol: str, price: float) -> str:
+    """
+    exchange.price_to_precision() as one format call when the tick is a power
+    of ten; other ticks (and unknown symbols) still go through ccxt.
+    """
+    meta = SYM_META.get(symbol)
+    if meta is None or meta.price_dp is None:
+        return exchange.price_to_precision(symbol, price)
+    return f"{price:.{meta.price_dp}f}"
+
+
+@_needs_markets
+def fetch_order_book(symbol: str) -> dict:
+    """Top of book from the WS cache, falling back to REST before the first snapshot."""
+    book = ws_cache.order_book(symbol)
+    if book is not None:
+        return book
+    return exchange.fetch_order_book(symbol)
+
+
+# (monotonic time, ws_cache.balance_epoch at fetch, fetch_balance result)
+_balance: tuple[float, int, dict] | None = None
+
+
+@_needs_markets
+def fetch_balance(max_age: float = 0.0) -> dict:
+    """
+    exchange.fetch_balance(), reusing the last result if younger than max_age
+    and the account feed has reported no change since it was fetched.
+
+    The default always hits the exchange (and refreshes the memo).
+    """
+    global _balance
+    now = time.monotonic()
+    if (_balance is not None and now - _balance[0] < max_age
+            and _balance[1] == ws_cache.balance_epoch):
+        return _balance[2]
+    epoch = ws_cache.balance_epoch        # read first: a change mid-call invalidates
     bal = exchange.fetch_balance()
-    free_usd = bal.get("USD", {}).get("free", 0)
-    cash = Decimal(str(free_usd))
-    logger.info("Free USD balance: %s", cash)
+    _balance = (now, epoch, bal)
+    return bal
+
+
+_ws_token_retry = 0.0       # monotonic time before which no new WS token is requested
+
+
+def cycle_balance() -> dict:
+    """
+    The main loop's balance for this cycle.
+
+    While the WS account feed is live the last REST balance is reused until
+    balances/executions report a change (or BALANCE_MAX_AGE passes);
+    without the feed only a balance younger than BALANCE_TTL is reused –
+    e.g. the start-up one from initialize_positions.  Orders invalidate
+    the memo either way.
+    """
+    global _ws_token_retry
+    if ws_cache.wants_token() and time.monotonic() >= _ws_token_retry:
+        try:
+            ws_cache.supply_token(exchange.privatePostGetWebSocketsToken()["result"]["token"])
+        except Exception as exc:          # e.g. key lacks the WebSocket permission
+            logger.warning("Could not get a WS token: %s", exc)
+            _ws_token_retry = time.monotonic() + BALANCE_MAX_AGE
+    return fetch_balance(BALANCE_MAX_AGE if ws_cache.private_live() else BALANCE_TTL)
+
+
+def invalidate_balance() -> None:
+    """Drop the memoized balance – call after an order so TTL readers see the fill."""
+    global _balance
+    _balance = None
+
+
+@_needs_markets
+def account_cash(bal: dict | None = None) -> Decimal:
+    """Get free USD cash balance (from `bal` if the caller already fetched it), with logging."""
+    logger.debug("account_cash called")
+    if bal is None:
+        bal = fetch_balance(BALANCE_TTL)
+    # BalanceEx returns strings: free = balance - hold_trade
+    raw = bal.get("info", {}).get("result", {}).get("ZUSD")
+    if isinstance(raw, dict) and isinstance(raw.get("balance"), str):
+        cash = Decimal(raw["balance"]) - Decimal(raw.get("hold_trade") or "0")
+    else:
+        cash = to_decimal(bal.get("USD", {}).get("free") or 0)
+    logger.debug("Free USD balance: %s", cash)   # also on the heartbeat line
     return cash
 
 
-def fetch_all_trades(symbol: str, max_pages: int = 20):
-    """Retrieve full trade history via pagination, with logging."""
+@_needs_markets
+def fetch_all_trades(symbol: str, max_pages: int = 20, since: int | None = None):
+    """Retrieve trade history (optionally from `since` ms on) via pagination, with logging."""
     #logger.info("fetch_all_trades called for %s (max_pages=%d)", symbol, max_pages)
-    trades, ofs = [], 0
+    pages: list[list[dict]] = []
+    ofs = 0
     for page_num in range(1, max_pages + 1):
         logger.debug("Fetching page %d for %s (ofs=%d)", page_num, symbol, ofs)
-        page = exchange.fetch_my_trades(symbol, params={"ofs": ofs})
+        page = exchange.fetch_my_trades(symbol, since=since, params={"ofs": ofs})
         if not page:
             logger.info("No more trades on page %d for %s", page_num, symbol)
             break
-        trades.extend(page)
+        if page[0]["timestamp"] > page[-1]["timestamp"]:
+            page.reverse()                 # newest-first page → ascending
+        pages.append(page)
         ofs += len(page)
-        logger.debug("Fetched %d trades; total so far: %d", len(page), len(trades))
+        logger.debug("Fetched %d trades; total so far: %d", len(page), ofs)
         if len(page) < 50:
             logger.info("Last page reached at page %d for %s", page_num, symbol)
             break
-    sorted_trades = sorted(trades, key=lambda t: t["timestamp"])
+
+    # each page is already in time order: concatenate when the pages follow
+    # one another, otherwise merge them (O(n log p) instead of a full sort)
+    key = lambda t: t["timestamp"]
+    if all(key(a[-1]) <= key(b[0]) for a, b in zip(pages, pages[1:])):
+        sorted_trades = [t for page in pages for t in page]
+    elif all(key(a[0]) >= key(b[-1]) for a, b in zip(pages, pages[1:])):
+        sorted_trades = [t for page in reversed(pages) for t in page]
+    else:
+        sorted_trades = list(heapq.merge(*pages, key=key))
     logger.info("Total trades fetched for %s: %d", symbol, len(sorted_trades))
     return sorted_trades
 
 
+# ─── FIFO CHECKPOINTS ─────────────────────────────────────────────────────
+# The open inventory is a pure function of the trade history, so it is
+# saved per symbol together with the newest trade applied; the next call
+# only fetches and replays the trades that came after it.
+_SINCE_SLACK_MS = 1000      # Kraken's `start` is whole seconds – re-read the last one
+_LOT_EPS = 1e-12            # float residue below this closes a FIFO lot
+
+
+def _inventory_path(symbol: str):
+    return INVENTORY_DIR / f"inventory_{symbol.replace('/', '-')}.json"
+
+
+def _load_inventory(symbol: str) -> tuple[int | None, dict[str, int], deque]:
+    try:
+        data = json.loads(_inventory_path(symbol).read_text())
+        return data["last_trade_ts"], data["recent_ids"], deque(map(tuple, data["inventory"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, {}, deque()
+
+
+def _save_inventory(symbol: str, last_ts: int | None, recent_ids: dict[str, int], inventory: deque) -> None:
+    data = {"last_trade_ts": last_ts, "recent_ids": recent_ids, "inventory": list(inventory)}
+    try:
+        write_atomic(_inventory_path(symbol), json.dumps(data))
+    except OSError as exc:
+        logger.warning("Could not checkpoint inventory for %s: %s", symbol, exc)
+
+
 def open_position_from_history(symbol: str):
     # In offline back-tests we start with a clean slate.
     if MODE == "SIM":
@@ -116,26 +575,40 @@ def open_position_from_history(symbol: str):
 
     """Compute net average entry for current open amount (FIFO), with logging."""
     logger.info("open_position_from_history called for %s", symbol)
-    inventory = []
-    for t in fetch_all_trades(symbol):
-        qty, price, side = t["amount"], t["price"], t["side"]
-        logger.debug("Processing trade: side=%s, qty=%s, price=%s", side, qty, price)
-        if side == "buy":
-            inventory.append([qty, price])
+    last_ts, recent_ids, inventory = _load_inventory(symbol)
+    since = None if last_ts is None else max(0, last_ts - _SINCE_SLACK_MS)
+    # running totals of what is left in inventory, kept during the walk
+    total_qty = sum(q for q, _ in inventory)
+    total_cost = sum(q * p for q, p in inventory)
+    for t in fetch_all_trades(symbol, since=since):
+        if since is not None and (t["timestamp"] < since or t["id"] in recent_ids):
+            continue                       # already in the checkpoint
+        if last_ts is None or t["timestamp"] > last_ts:
+            last_ts = t["timestamp"]
+        recent_ids[t["id"]] = t["timestamp"]
+        qty, price = t["amount"], t["price"]
+        if t["side"] == "buy":
+            inventory.append((qty, price))
+            total_qty += qty
+            total_cost += qty * price
         else:
             rem = qty
-            logger.debug("Matching sell qty=%s against inventory entries", rem)
             while rem > 0 and inventory:
-                if inventory[0][0] > rem:
-                    inventory[0][0] -= rem
-                    logger.debug("Partially matched; remaining entry qty=%s", inventory[0][0])
-                    rem = 0
+                q, p = inventory[0]
+                used = min(q, rem)
+                if q - rem > _LOT_EPS:
+                    inventory[0] = (q - rem, p)
                 else:
-                    rem -= inventory[0][0]
-                    logger.debug("Fully consumed entry; removing inventory[0]")
-                    inventory.pop(0)
-    total_qty = sum(q for q, _ in inventory)
-    total_cost = sum(q * p for q, p in inventory)
+                    inventory.popleft()
+                rem -= used
+                total_qty -= used
+                total_cost -= used * p
+    if last_ts is not None:
+        # only trades inside the re-read window can show up again
+        recent_ids = {i: ts for i, ts in recent_ids.items() if ts >= last_ts - _SINCE_SLACK_MS}
+    if not inventory:
+        total_qty = total_cost = 0.0       # drop float residue of a flat book
+    _save_inventory(symbol, last_ts, recent_ids, inventory)
     avg_price = Decimal("0")
     if total_qty:
         avg_price = Decimal(str(total_cost / total_qty))
@@ -143,10 +616,8 @@ def open_position_from_history(symbol: str):
     return total_qty, avg_price
 
 
+@_needs_markets
 def lot_step(sym: str) -> Decimal:
     """Return the minimum tradable lot size for sym, with logging."""
     #logger.info("lot_step called for %s", sym)
-    raw = exchange.markets[sym]["limits"]["amount"]["min"] or 0
-    step = Decimal(str(raw))
-    #logger.info("Min lot step for %s: %s", sym, step)
-    return step
+    return SYM_META[sym].min_lot
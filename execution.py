@@ -1,35 +1,45 @@
 import ccxt
 from decimal import Decimal
-from exchange_client import exchange, fetch_price
+from exchange_client import exchange, fetch_balance, invalidate_balance, fetch_price, fetch_order_book, price_to_precision, SYM_META
+from config import BALANCE_TTL
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-def safe_limit_sell(symbol: str, qty: float) -> bool:
-    """Place a maker sell order or skip if conditions fail, with detailed logging."""
+def safe_limit_sell(
+    symbol: str, qty: float, bal: dict | None = None, price: float | None = None
+) -> bool:
+    """
+    Place a maker sell order or skip if conditions fail, with detailed logging.
+
+    Pass the cycle's fetch_balance() result as `bal` to avoid another signed
+    REST call per sell; when omitted, a balance younger than BALANCE_TTL is reused.
+    Likewise pass the caller's `price` to skip the ticker lookup.
+    """
     logger.info("safe_limit_sell called for %s with requested qty=%.8f", symbol, qty)
-    market = exchange.market(symbol)
-    active = market.get("active", False)
-    if not active:
+    meta = SYM_META.get(symbol)
+    if meta is None or not meta.active:
         logger.warning("Skip %s – inactive/delisted", symbol)
         return False
     logger.debug("Market %s is active", symbol)
 
-    price = fetch_price(symbol)
-    logger.debug("Fetched current price for %s: %s", symbol, price)
-    if price <= 0:
+    if price is None:
+        price = fetch_price(symbol)
+        logger.debug("Fetched current price for %s: %s", symbol, price)
+    if price is None or price <= 0:
         logger.warning("Skip %s – non-positive price %s", symbol, price)
         return False
 
-    base = market["base"]
-    bal = exchange.fetch_balance()
-    free = bal.get(base, {}).get("free", 0)
-    total = bal.get(base, {}).get("total", 0)
+    base = meta.base
+    if bal is None:
+        bal = fetch_balance(BALANCE_TTL)
+    acct = bal.get(base) or {}
+    free, total = acct.get("free") or 0, acct.get("total") or 0
     logger.info("Balance for %s – free: %.8f, total: %.8f", base, free, total)
     qty = min(qty, free)
 
-    min_lot = market.get("limits", {}).get("amount", {}).get("min") or 0
+    min_lot = meta.min_lot
     logger.debug("Min lot for %s: %.8f", symbol, min_lot)
     if qty < min_lot:
         logger.warning("Skip sell %s – adjusted qty %.8f < min_lot %.8f", symbol, qty, min_lot)
@@ -37,16 +47,17 @@ def safe_limit_sell(symbol: str, qty: float) -> bool:
 
     try:
         logger.info("Fetching order book for %s", symbol)
-        book = exchange.fetch_order_book(symbol)
+        book = fetch_order_book(symbol)
         best_bid = book["bids"][0][0]
         logger.debug("Best bid price for %s: %s", symbol, best_bid)
 
-        price_str = exchange.price_to_precision(symbol, best_bid)
+        price_str = price_to_precision(symbol, best_bid)
         price = float(price_str)
         logger.debug("Rounded price for order: %s", price)
 
         logger.info("Creating post-only limit sell order for %s: qty=%.8f at price=%.8f", symbol, qty, price)
         order = exchange.create_limit_sell_order(symbol, qty, price, {"postOnly": True})
+        invalidate_balance()
         logger.info("✅ Sold %.8f %s – order id %s", qty, symbol, order.get("id"))
         return True
     except ccxt.InsufficientFunds:
@@ -59,15 +70,15 @@ def safe_limit_sell(symbol: str, qty: float) -> bool:
 def place_mm_orders(symbol: str, stake_usd: float, spread_pct: float = 0.002):
     """Place paired post-only bids and asks around mid-price, with detailed logging."""
     logger.info("place_mm_orders called for %s with stake_usd=%.2f, spread_pct=%.3f", symbol, stake_usd, spread_pct)
-    book = exchange.fetch_order_book(symbol)
+    book = fetch_order_book(symbol)
     mid = (book["bids"][0][0] + book["asks"][0][0]) / 2
     logger.debug("Calculated mid price for %s: %s", symbol, mid)
 
     size = stake_usd / mid
     logger.debug("Calculated order size for %s: %s", symbol, size)
 
-    buy_price_str = exchange.price_to_precision(symbol, mid * (1 - spread_pct / 2))
-    sell_price_str = exchange.price_to_precision(symbol, mid * (1 + spread_pct / 2))
+    buy_price_str = price_to_precision(symbol, mid * (1 - spread_pct / 2))
+    sell_price_str = price_to_precision(symbol, mid * (1 + spread_pct / 2))
     buy_p = Decimal(buy_price_str)
     sell_p = Decimal(sell_price_str)
     logger.info("Placing buy order for %s: size=%s at price=%s", symbol, size, buy_p)
@@ -1,108 +1,478 @@
 import math
-from datetime import datetime
+import time
+from collections import deque
+from functools import lru_cache
 from decimal import Decimal
-from typing import List
-from exchange_client import exchange, fetch_price, map_sym
+import numpy as np
+try:
+    from numba import njit
+except ImportError:                      # optional – the NumPy kernels below are used instead
+    njit = None
+from exchange_client import exchange, fetch_price, fetch_order_book, map_sym, PUBLIC_POOL
 from config import EMA_PERIOD, ATR_PERIOD, RISK_FRAC, MODE
 import logging
+import ws_cache
 
 logger = logging.getLogger(__name__)
 
-# a simple cache so you don't hammer the API every tick
-_trend_cache: dict[str, float] = {}
+# (symbol, period) → (4h bucket, trend EMA) and → (ts of last closed 4h bar,
+# EMA through that bar)
+_trend_cache: dict[tuple[str, int], tuple[int, float]] = {}
+_trend_state: dict[tuple[str, int], tuple[int, float]] = {}
 
+# candles only change once per bar, so REST results are reused until the
+# wall clock crosses into the next bucket of that timeframe
+_BUCKET_SECONDS = {"1m": 60, "1h": 3600, "4h": 14400}
 
-class SimExchange:
-    # ...
-    def fetch_ohlcv(self, symbol, timeframe="1m", limit=100, **_):
-        # assume self.df is bar-indexed; slice the last `limit` rows
-        bars = self.df.iloc[max(0, self.i - limit): self.i + 1][symbol]
-        return [
-            [None, o, h, l, c, None]          # timestamp, open, high, low, close, volume
-            for o, h, l, c in zip(bars.open, bars.high, bars.low, bars.close)
-        ]
 
+# (symbol, timeframe, limit) → (bucket, since, candles); one slot per key,
+# so a rollover replaces the stale bars instead of leaving them to an LRU
+_ohlcv_cache: dict[tuple[str, str, int | None], tuple[int, int | None, np.ndarray]] = {}
+
+
+def fetch_ohlcv_cached(
+    symbol: str, timeframe: str, limit: int | None, since: int | None = None
+) -> np.ndarray:
+    """
+    fetch_ohlcv memoized per (symbol, timeframe, limit, since, time bucket).
+
+    Converted once to a (bars, 6) float64 array, so ema()/atr() slice
+    columns instead of re-walking ccxt's list of rows on every read.
+
+    Kraken answers a `limit`-only request with its full 720-bar window (ccxt
+    trims client-side); incremental readers pass `since` instead, which
+    the server honours, so only the bars they have not seen are sent.
+    """
+    bucket = int(time.time() // _BUCKET_SECONDS[timeframe])
+    key = (symbol, timeframe, limit)
+    hit = _ohlcv_cache.get(key)
+    if hit is not None and hit[0] == bucket and hit[1] == since:
+        return hit[2]
+    rows = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+    candles = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+    _ohlcv_cache[key] = (bucket, since, candles)
+    return candles
+
+
+def trend_4h_ema(symbol: str, period: int = 50) -> float:
+    """
+    EMA over closed 4h bars, kept incrementally like ema().
+
+    Seeded once from `period` bars; afterwards only the bars after the last
+    folded one are read, and the value is reused until the next 4h bar opens.
+    """
+    sym = map_sym(symbol)
+    bucket = int(time.time() // _BUCKET_SECONDS["4h"])
+    hit = _trend_cache.get((sym, period))
+    if hit is not None and hit[0] == bucket:
+        return hit[1]
+
+    k = 2 / (period + 1)
+    state = _trend_state.get((sym, period))
+    if state is not None:
+        closed_ts, e = state
+        recent = fetch_ohlcv_cached(sym, "4h", None, since=closed_ts + _FOUR_H_MS)
+        if len(recent) and recent[0][0] <= closed_ts + _FOUR_H_MS and recent[-1][0] > closed_ts:
+            for bar in recent[:-1]:
+                if bar[0] > closed_ts:
+                    e = float(bar[4]) * k + e * (1 - k)
+                    closed_ts = int(bar[0])
+        else:
+            state = None                  # gap or odd data → reseed
+
+    if state is None:
+        candles = fetch_ohlcv_cached(sym, "4h", period + 1)
+        if len(candles) < 2:
+            return float(candles[-1][4]) if len(candles) else 0.0
+        e = float(_ema_kernel(np.ascontiguousarray(candles[:-1, 4]), k))
+        closed_ts = int(candles[-2, 0])
+
+    _trend_state[(sym, period)] = (closed_ts, e)
+    _trend_cache[(sym, period)] = (bucket, e)
+    return e
+
+# (symbol, n) → (timestamp of last *closed* 1h bar, EMA through that bar)
+_ema_state: dict[tuple[str, int], tuple[int, float]] = {}
+_HOUR_MS = 3_600_000
+_MINUTE_MS = 60_000
+_FOUR_H_MS = 4 * _HOUR_MS
+_EMA_K = 2 / (EMA_PERIOD + 1)           # smoothing factor of the default period
+
+
+# ─── NUMERIC KERNELS ──────────────────────────────────────────────────────
+# float64 arrays in, JIT-compiled loops when numba is installed,
+# vectorized NumPy otherwise – both give the same result.
+@lru_cache(maxsize=32)
+def _ema_weights(m: int, k: float) -> np.ndarray:
+    # closed form of e = price*k + e*(1-k) seeded with the first close:
+    # close[i] carries weight k*(1-k)^(m-1-i), the seed carries (1-k)^(m-1)
+    decay = (1 - k) ** np.arange(m - 1, -1, -1)
+    weights = k * decay
+    weights[0] = decay[0]
+    weights.flags.writeable = False       # shared between calls
+    return weights
+
+
+def _ema_closed_form(closes: np.ndarray, k: float) -> float:
+    return float(_ema_weights(len(closes), k) @ closes)
+
+
+def _tr_numpy(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    # true range of bars 1..m-1 against the previous close
+    # pairwise maxima into one buffer – no (3, m) stack of temporaries
+    prev_close = close[:-1]
+    h, l = high[1:], low[1:]
+    tr = h - l
+    np.maximum(tr, np.abs(h - prev_close), out=tr)
+    np.maximum(tr, np.abs(l - prev_close), out=tr)
+    return tr
+
+
+def _sums_numpy(px, qty, amt, avg, held_px):
+    priced = ~np.isnan(held_px)
+    return (
+        float(px @ qty),
+        float(amt @ avg),
+        float(amt[priced] @ (held_px[priced] - avg[priced])),
+    )
+
+
+# bit i of a screen code is set when SCREEN_RULES[i] rejects the symbol
+SCREEN_RULES = ("inactive", "cash<min", "no-ref", "no-dip")
+
+
+def _screen_numpy(price, ref, req, active, cash, threshold):
+    codes = (~active | (price == 0)).astype(np.uint8)
+    codes |= (cash < req).astype(np.uint8) << 1
+    codes |= (ref <= 0).astype(np.uint8) << 2
+    codes |= ((ref > 0) & (price > ref * threshold)).astype(np.uint8) << 3
+    return codes
+
+
+def _exits_numpy(price, prev_peak, sl, tp, keep):
+    peak = np.maximum(prev_peak, price)
+    trail = peak * keep
+    lifted = trail > sl
+    sl = np.where(lifted, trail, sl)
+    take = price >= tp
+    stop = ~take & (price <= sl)
+    return peak, sl, lifted, take, stop
+
+
+# no fastmath on these: it would let the compiler assume away the NaN
+# that marks an unpriced position
+if njit is not None:
+    @njit(cache=True)
+    def _ema_kernel(closes, k):
+        e = closes[0]
+        for i in range(1, closes.shape[0]):
+            e = closes[i] * k + e * (1 - k)
+        return e
+
+    @njit(cache=True)
+    def _tr_kernel(high, low, close):
+        tr = np.empty(close.shape[0] - 1)
+        for i in range(1, close.shape[0]):
+            pc = close[i - 1]
+            tr[i - 1] = max(high[i] - low[i], abs(high[i] - pc), abs(low[i] - pc))
+        return tr
+
+    @njit(cache=True)
+    def _sums_kernel(px, qty, amt, avg, held_px):
+        value = 0.0
+        for i in range(px.shape[0]):
+            value += px[i] * qty[i]
+        cost = 0.0
+        unreal = 0.0
+        for i in range(amt.shape[0]):
+            cost += amt[i] * avg[i]
+            if not np.isnan(held_px[i]):
+                unreal += amt[i] * (held_px[i] - avg[i])
+        return value, cost, unreal
+
+    @njit(cache=True)
+    def _screen_kernel(price, ref, req, active, cash, threshold):
+        codes = np.zeros(price.shape[0], np.uint8)
+        for i in range(price.shape[0]):
+            c = 0
+            if not active[i] or price[i] == 0:
+                c |= 1
+            if cash < req[i]:
+                c |= 2
+            if ref[i] <= 0:
+                c |= 4
+            elif price[i] > ref[i] * threshold:
+                c |= 8
+            codes[i] = c
+        return codes
+
+    @njit(cache=True)
+    def _exits_kernel(price, prev_peak, sl, tp, keep):
+        n = price.shape[0]
+        peak = np.empty(n)
+        new_sl = np.empty(n)
+        lifted = np.zeros(n, np.bool_)
+        take = np.zeros(n, np.bool_)
+        stop = np.zeros(n, np.bool_)
+        for i in range(n):
+            p = max(prev_peak[i], price[i])
+            peak[i] = p
+            s = sl[i]
+            if p * keep > s:
+                s = p * keep
+                lifted[i] = True
+            new_sl[i] = s
+            if price[i] >= tp[i]:
+                take[i] = True
+            elif price[i] <= s:
+                stop[i] = True
+        return peak, new_sl, lifted, take, stop
+else:
+    _ema_kernel = _ema_closed_form
+    _tr_kernel = _tr_numpy
+    _sums_kernel = _sums_numpy
+    _screen_kernel = _screen_numpy
+    _exits_kernel = _exits_numpy
+
+
+def portfolio_sums(px, qty, amt, avg, held_px) -> tuple[float, float, float]:
+    """
+    (wallet value, cost basis, unrealised PnL) from float64 columns: wallet
+    `px`/`qty` per symbol, `amt`/`avg`/`held_px` per open position (NaN = unpriced).
+    """
+    value, cost, unreal = _sums_kernel(px, qty, amt, avg, held_px)
+    return float(value), float(cost), float(unreal)
+
+
+def screen_codes(price, ref, req, active, cash: float, threshold: float) -> np.ndarray:
+    """uint8 reject code per symbol (0 = passes); see SCREEN_RULES for the bits."""
+    return _screen_kernel(price, ref, req, active, cash, threshold)
+
+
+def exit_levels(price, prev_peak, sl, tp, keep: float):
+    """
+    Trailing-stop lift and TP / SL test over float64 columns, one row per
+    open position: (peak, stop after the lift, lifted, take-profit, stop-loss).
+    """
+    return _exits_kernel(price, prev_peak, sl, tp, keep)
+
+
+def warm_up_kernels() -> None:
+    """Compile (or load the cached) JIT kernels before the first trading cycle."""
+    dummy = np.linspace(1.0, 2.0, 8)
+    _ema_kernel(dummy, 0.5)
+    _tr_kernel(dummy, dummy, dummy)
+    _sums_kernel(dummy, dummy, dummy, dummy, dummy)
+    _screen_kernel(dummy, dummy, dummy, np.ones(8, dtype=bool), 1.0, 0.5)
+    _exits_kernel(dummy, dummy, dummy, dummy, 0.5)
 
-def trend_4h_ema(symbol: str, period: int = 50, limit: int = 100) -> float:
-    # only refresh every N minutes or on cache-miss
-    #ohlcv = exchange.fetch_ohlcv(symbol, timeframe="4h", limit=limit)
-    sym  = map_sym(symbol) 
-    ohlc = exchange.fetch_ohlcv(sym, "1m", limit=n + 1)
-    closes = [row[4] for row in ohlcv]
-    ema_values = ema(closes, period)
-    _trend_cache[symbol] = ema_values[-1]
-    return ema_values[-1]
 
 def ema(symbol: str, n: int = EMA_PERIOD) -> Decimal:
-    """Calculate simple EMA over 1h closes with logging."""
+    """
+    EMA over 1h closes, kept incrementally per symbol.
 
+    The first call seeds the EMA from n candles; afterwards only the last
+    two candles are read and the recurrence is advanced by one step when
+    a new bar has closed.  The still-open bar is folded in on top.
+    """
     if MODE == "SIM":
         symbol = map_sym(symbol)
-        
-    #logger.info(f"Fetching {n} 1h candles for EMA calculation of {symbol}")
-    candles = exchange.fetch_ohlcv(symbol, "1h", limit=n)
-
-    closes = [c[4] for c in candles]
-    k = 2 / (n + 1)
-    e = closes[0]
-    #logger.info(f"{symbol} EMA initial value (first close): {e}")
-    for i, price in enumerate(closes[1:], start=1):
-        e = price * k + e * (1 - k)
-        logger.debug(f"{symbol} EMA step {i}: price={price}, ema={e}")
-    ema_value = Decimal(e)
-    #logger.info(f"Computed EMA({symbol}, {n}): {ema_value}")
+
+    k = _EMA_K if n == EMA_PERIOD else 2 / (n + 1)
+    state = _ema_state.get((symbol, n))
+    if state is not None:
+        closed_ts, e_closed = state
+        # REST: only the bars after the last folded one (see atr())
+        recent = (
+            ws_cache.candles(symbol, "1h", 2)
+            or fetch_ohlcv_cached(symbol, "1h", None, since=closed_ts + _HOUR_MS)
+        )
+        if len(recent) and recent[0][0] <= closed_ts + _HOUR_MS and recent[-1][0] > closed_ts:
+            for bar in recent[:-1]:
+                if bar[0] > closed_ts:
+                    e_closed = float(bar[4]) * k + e_closed * (1 - k)
+                    closed_ts = int(bar[0])
+            _ema_state[(symbol, n)] = (closed_ts, e_closed)
+        else:
+            state = None                  # a gap the WS ring can't bridge, or odd data → reseed
+
+    if state is None:
+        #logger.info("Fetching %d 1h candles for EMA calculation of %s", n, symbol)
+        candles = ws_cache.candles(symbol, "1h", n) or fetch_ohlcv_cached(symbol, "1h", n)
+        if len(candles) < 2:
+            return Decimal(repr(float(candles[-1][4]))) if len(candles) else Decimal("0")
+        arr = np.asarray(candles, dtype=np.float64)     # no copy for REST candles
+        e_closed = float(_ema_kernel(np.ascontiguousarray(arr[:-1, 4]), k))
+        _ema_state[(symbol, n)] = (int(arr[-2, 0]), e_closed)
+        recent = arr[-2:]
+
+    e = float(recent[-1][4]) * k + e_closed * (1 - k)
+    ema_value = Decimal(repr(e))
+    #logger.info("Computed EMA(%s, %d): %s", symbol, n, ema_value)
     return ema_value
 
 
+def ema_update(symbol: str, price, n: int = EMA_PERIOD) -> Decimal:
+    """
+    EMA with the live `price` standing in for the still-open bar.
+
+    O(1) and no candle read while the closed-bar state is current; ema()
+    is only called to advance (or seed) it after a new 1h bar has closed.
+    """
+    key = (map_sym(symbol) if MODE == "SIM" else symbol, n)
+    last_closed = (int(time.time() * 1000) // _HOUR_MS - 1) * _HOUR_MS
+    state = _ema_state.get(key)
+    if state is None or state[0] != last_closed:
+        fallback = ema(symbol, n)
+        state = _ema_state.get(key)
+        if state is None:                 # too few candles to seed
+            return fallback
+    k = _EMA_K if n == EMA_PERIOD else 2 / (n + 1)
+    return Decimal(repr(float(price) * k + state[1] * (1 - k)))
+
+
+# (symbol, n) → (minute bucket, ATR); one entry per key, overwritten on rollover
+_atr_cache: dict[tuple[str, int], tuple[int, Decimal]] = {}
+# (symbol, n) → (ts of last closed 1m bar, ring of its n-1 closed-bar true
+# ranges, their running sum, close of that bar)
+_atr_state: dict[tuple[str, int], tuple[int, deque, float, float]] = {}
+
+
+def _true_range(bar: list, prev_close: float) -> float:
+    high, low = float(bar[2]), float(bar[3])
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
 def atr(symbol: str, n: int = ATR_PERIOD) -> Decimal:
     if MODE == "SIM":
         return None   
     """
     Average True Range on 1-minute candles with logging.
 
+    Memoized per 1m bucket: the poll sizing, entry and ledger calls that
+    land in the same minute share one candle read and computation.  Like
+    ema(), the closed bars are kept incrementally: after seeding, each new
+    minute reads two candles and pushes one true range into a ring.
+
     Returns:
         Decimal(ATR)  – 0 if fewer than 2 candles.
     """
-    logger.info(f"Fetching {n + 1} 1m candles for ATR calculation of {symbol}")
-    ohlc: List[List[float | str]] = exchange.fetch_ohlcv(symbol, "1m", limit=n + 1)
-    if len(ohlc) < 2:
-        logger.warning(f"Not enough data to compute ATR({symbol}, {n}); returning 0")
-        return Decimal("0")
-
-    trs: List[Decimal] = []
-    for idx, (prev, curr) in enumerate(zip(ohlc, ohlc[1:]), start=1):
-        prev_close = Decimal(str(prev[4]))
-        high = Decimal(str(curr[2]))
-        low = Decimal(str(curr[3]))
-        tr = max(
-            high - low,
-            abs(high - prev_close),
-            abs(low - prev_close),
+    bucket = int(time.time() // _BUCKET_SECONDS["1m"])
+    hit = _atr_cache.get((symbol, n))
+    if hit is not None and hit[0] == bucket:
+        return hit[1]
+
+    state = _atr_state.get((symbol, n))
+    if state is not None:
+        closed_ts, trs, tr_sum, closed_close = state
+        # REST: only the bars after the last folded one – usually one closed
+        # bar and the open one, and after a short gap all the missed bars
+        recent = (
+            ws_cache.candles(symbol, "1m", 2)
+            or fetch_ohlcv_cached(symbol, "1m", None, since=closed_ts + _MINUTE_MS)
+        )
+        if len(recent) and recent[0][0] <= closed_ts + _MINUTE_MS and recent[-1][0] > closed_ts:
+            for bar in recent[:-1]:
+                if bar[0] <= closed_ts:
+                    continue
+                tr = _true_range(bar, closed_close)
+                if len(trs) == trs.maxlen:
+                    tr_sum -= trs[0]      # about to fall out of the ring
+                trs.append(tr)
+                tr_sum += tr
+                closed_ts, closed_close = int(bar[0]), float(bar[4])
+            state = (closed_ts, trs, tr_sum, closed_close)
+            _atr_state[(symbol, n)] = state
+        else:
+            state = None                  # a gap the WS ring can't bridge, or odd data → reseed
+
+    if state is None:
+        logger.info("Fetching %d 1m candles for ATR calculation of %s", n + 1, symbol)
+        ohlc = (
+            ws_cache.candles(symbol, "1m", n + 1)
+            or fetch_ohlcv_cached(symbol, "1m", n + 1)
+        )
+        if len(ohlc) < 2:
+            logger.warning("Not enough data to compute ATR(%s, %d); returning 0", symbol, n)
+            return Decimal("0")
+        arr = np.asarray(ohlc, dtype=np.float64)     # no copy for REST candles
+        tr = _tr_kernel(
+            np.ascontiguousarray(arr[:, 2]),
+            np.ascontiguousarray(arr[:, 3]),
+            np.ascontiguousarray(arr[:, 4]),
         )
-        trs.append(tr)
-        logger.debug(f"{symbol} True Range step {idx}: {tr}")
+        trs = deque(tr[:-1].tolist(), maxlen=n - 1)
+        state = (int(arr[-2, 0]), trs, math.fsum(trs), float(arr[-2, 4]))
+        _atr_state[(symbol, n)] = state
+        live_tr = float(tr[-1])
+    else:
+        live_tr = _true_range(recent[-1], state[3])
 
-    atr_value = sum(trs) / Decimal(len(trs))
-    logger.info(f"Computed ATR({symbol}, {n}): {atr_value}")
+    # n-1 closed bars from the ring plus the still-open bar
+    atr_value = Decimal(repr((state[2] + live_tr) / (len(state[1]) + 1)))
+    logger.info("Computed ATR(%s, %d): %s", symbol, n, atr_value)
+    _atr_cache[(symbol, n)] = (bucket, atr_value)
     return atr_value
 
 
-def pos_size(entry: float, stop: float, equity: float) -> Decimal:
+def _prefetch_one(job: tuple[str, str, int | None, int | None]) -> None:
+    try:
+        fetch_ohlcv_cached(*job)
+    except Exception as exc:              # the inline read will retry and report
+        logger.debug("Candle prefetch %s failed: %s", job, exc)
+
+
+def prefetch_candles(symbols: list[str]) -> None:
+    """
+    Warm the candle cache for this cycle's ema_update()/atr() reads.
+
+    Only reads the WS feed cannot serve and the memo does not already hold
+    are issued, concurrently on the public pool; the per-symbol calls that
+    follow then hit fetch_ohlcv_cached instead of paying one RTT each.
+    """
+    last_closed = (int(time.time() * 1000) // _HOUR_MS - 1) * _HOUR_MS
+    minute = int(time.time() // _BUCKET_SECONDS["1m"])
+    jobs: list[tuple[str, str, int | None, int | None]] = []
+    for sym in symbols:
+        key_sym = map_sym(sym) if MODE == "SIM" else sym
+        state = _ema_state.get((key_sym, EMA_PERIOD))
+        if state is None:
+            if ws_cache.candles(key_sym, "1h", EMA_PERIOD) is None:
+                jobs.append((key_sym, "1h", EMA_PERIOD, None))
+        elif state[0] != last_closed and ws_cache.candles(key_sym, "1h", 2) is None:
+            jobs.append((key_sym, "1h", None, state[0] + _HOUR_MS))
+        hit = _atr_cache.get((sym, ATR_PERIOD))
+        if MODE != "SIM" and (hit is None or hit[0] != minute):
+            state = _atr_state.get((sym, ATR_PERIOD))
+            if state is None:
+                if ws_cache.candles(sym, "1m", ATR_PERIOD + 1) is None:
+                    jobs.append((sym, "1m", ATR_PERIOD + 1, None))
+            elif ws_cache.candles(sym, "1m", 2) is None:
+                jobs.append((sym, "1m", None, state[0] + _MINUTE_MS))
+    if len(jobs) > 1:                     # a single read gains nothing from the pool
+        list(PUBLIC_POOL.map(_prefetch_one, jobs))
+
+
+_RISK_FRAC_F = float(RISK_FRAC)
+
+
+def pos_size(entry: float, stop: float, equity: float) -> float:
     """Return quantity sizing given risk fraction, with logging."""
-    logger.info(f"Calculating position size: entry={entry}, stop={stop}, equity={equity}")
-    risk = equity * RISK_FRAC
+    logger.info("Calculating position size: entry=%s, stop=%s, equity=%s", entry, stop, equity)
+    # sizing is risk arithmetic, not exchange precision – stay in float
+    risk = equity * _RISK_FRAC_F
     unit = abs(entry - stop)
-    size = (Decimal(risk) / Decimal(unit)) if unit else Decimal(0)
-    logger.info(f"Risk amount: {risk}, price unit: {unit}, position size: {size}")
+    size = risk / unit if unit else 0.0
+    logger.info("Risk amount: %s, price unit: %s, position size: %s", risk, unit, size)
     return size
 
 # Depth EMA filter
-_depth_ema: dict[str, Decimal] = {}
+_depth_ema: dict[str, float] = {}
 
-def update_depth_ema(symbol: str, alpha: float = 0.2, levels: int = 5) -> Decimal:
+def update_depth_ema(symbol: str, alpha: float = 0.2, levels: int = 5) -> float:
     """Update and return EMA of order book depth at top levels, with logging."""
-    logger.info(f"Fetching order book for {symbol} (top {levels} levels)")
-    book = exchange.fetch_order_book(symbol)
+    logger.info("Fetching order book for %s (top %d levels)", symbol, levels)
+    book = fetch_order_book(symbol)
     bid_depth = sum(entry[1] for entry in book.get("bids", [])[:levels])
     ask_depth = sum(entry[1] for entry in book.get("asks", [])[:levels])
     total = bid_depth + ask_depth
@@ -111,5 +481,5 @@ def update_depth_ema(symbol: str, alpha: float = 0.2, levels: int = 5) -> Decima
     new = alpha * total + (1 - alpha) * prev
     _depth_ema[symbol] = new
 
-    logger.info(f"Depth EMA updated for {symbol}: previous={prev}, total={total}, new EMA={new}")
+    logger.info("Depth EMA updated for %s: previous=%s, total=%s, new EMA=%s", symbol, prev, total, new)
     return new
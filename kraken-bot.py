@@ -1,36 +1,47 @@
 import sys
+import math
+import logging
 import time
-import datetime
 from decimal import Decimal
+from collections import deque
 from dataclasses import dataclass
 from typing import Dict, List, Tuple
 from types import SimpleNamespace  
-from config import LOG_PATH, SYMBOLS, POLL_INTERVAL, RISK_FRAC, DIP_THRESHOLD, MIN_ORDER_USD
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from config import LOG_PATH, SYMBOLS, BASE_ASSET, POLL_INTERVAL, POLL_VOL_REF, POLL_MIN, POLL_MAX, RISK_FRAC, DIP_THRESHOLD, MIN_ORDER_USD, MAX_OPEN, MODE, ORDER_CONCURRENCY, PRICE_BUCKETS, MAX_STALENESS
 from logger_setup import setup_logger
-from exchange_client import fetch_price, account_cash, exchange, lot_step
-from ledger import append_new_trades, initialize_positions
-from strategy import TradeAction, generate_actions
-from indicators import ema
-
-last_price: Dict[str, Decimal] = {}
+from exchange_client import cycle_balance, invalidate_balance, fetch_prices, use_cycle_prices, account_cash, exchange, refresh_markets, live_symbols, shutdown, SYM_META, PUBLIC_POOL
+from ledger import append_new_trades, initialize_positions, load_bot_state, save_bot_state
+from strategy import TradeAction, generate_actions, screen_exits
+from indicators import ema_update, atr, warm_up_kernels, prefetch_candles, portfolio_sums, screen_codes, SCREEN_RULES
+import ws_cache
+import nas_mirror
+
+last_price: Dict[str, float] = {}
 ACTIVE_SYMBOLS: list[str] = []
 
+# float views of the Decimal config values the float metrics path uses
+_RISK_FRAC_F = float(RISK_FRAC)
+_MIN_ORDER_F = float(MIN_ORDER_USD)
+
 # ──────────────────────────────────────────────────────────────────────────
 # LOGGER SETUP
-logger = setup_logger(log_path=LOG_PATH)
+setup_logger(log_path=LOG_PATH)
+logger = logging.getLogger(__name__)
 logger.info("🟢 Kraken bot starting…")
 
 # ──────────────────────────────────────────────────────────────────────────
 # DATA CLASSES
 @dataclass
 class PortfolioMetrics:
-    cash: Decimal
-    equity: Decimal
-    cost_basis: Decimal
-    unreal: Decimal
-    ticket: Decimal
+    cash: Decimal               # stays Decimal – it caps order sizes
+    equity: float
+    cost_basis: float
+    unreal: float
+    ticket: float
     open_n: int
-    wallet_qty: Dict[str, Decimal]
+    wallet_qty: Dict[str, float]
 
 # ──────────────────────────────────────────────────────────────────────────
 # INITIALIZE PEAK CACHE
@@ -48,48 +59,54 @@ def initialize_peak_cache(positions: Dict[str, dict]) -> Dict[str, Decimal]:
 
 # ──────────────────────────────────────────────────────────────────────────
 # SNAPSHOT METRICS
-def snapshot_metrics(positions: Dict[str, dict]) -> Tuple[Dict[str, Decimal], PortfolioMetrics]:
-    start = time.time()
+def snapshot_metrics(
+    positions: Dict[str, dict],
+    price_snapshot: Dict[str, float],
+    bal: dict,
+    cash: Decimal,
+) -> Tuple[Dict[str, float], PortfolioMetrics]:
     """
     Return (price_snapshot, metrics)
 
-    * price_snapshot includes **only** symbols that returned a real price.
+    * price_snapshot (from fetch_prices) includes **only** symbols that
+      returned a real price.
     * We compute wallet balances and metrics over that same key set, so we
       never index a missing key.
     """
-    price_snapshot: dict[str, Decimal] = {
-        sym: p
-        for sym in ACTIVE_SYMBOLS
-        if (p := fetch_price(sym)) is not None
-    }
+    start = time.time()
 
-    # no prices ⇒ no metrics
-    if not price_snapshot:
-        return price_snapshot, {}
+    # Metrics only feed logs and sizing ratios, so they are computed as
+    # float vectors; Decimal is kept for the order boundary (cash, qty).
+    syms = list(price_snapshot)
+    n = len(syms)
 
     # ---- wallet quantities (only for symbols we know prices for) ---------
-    bal = exchange.fetch_balance()
-    cash = Decimal(str(account_cash()))
-    wallet_qty: dict[str, Decimal] = {}
-    for sym in price_snapshot:
-        base = sym.split("/")[0]
-        wallet_qty[sym] = Decimal(str(bal.get(base, {}).get("total", 0)))
+    # ccxt's flat {asset: total} view – one dict get per symbol
+    # straight into the array; the per-symbol dict is derived from it
+    totals = bal.get("total") or {}
+    qty = np.fromiter(
+        (totals.get(BASE_ASSET[s]) or 0 for s in syms), dtype=np.float64, count=n
+    )
+    wallet_qty: dict[str, float] = dict(zip(syms, qty.tolist()))
+    px = np.fromiter((price_snapshot[s] for s in syms), dtype=np.float64, count=n)
+
+    # ---- open positions as one (amount, avg, price) array ---------------
+    # `positions` here is the open-only sidecar kept by the main loop; a
+    # single pass fills all three columns, NaN marking an unpriced symbol
+    nan = float("nan")
+    open_n = len(positions)
+    held = np.array(
+        [(pos["amount"], pos.get("avg_price", 0), price_snapshot.get(sym, nan))
+         for sym, pos in positions.items()],
+        dtype=np.float64,
+    ).reshape(open_n, 3)
+    amt, avg, held_px = (np.ascontiguousarray(c) for c in held.T)
 
     # ---- aggregate metrics ----------------------------------------------
-    portfolio_value = sum(wallet_qty[s] * price_snapshot[s] for s in price_snapshot)
-    cost_basis = sum(pos["amount"] * pos.get("avg_price", Decimal(0)) for pos in positions.values() if pos)
-    equity = cash + portfolio_value
-
-    unreal = sum(
-        pos["amount"] * (price - pos["avg_price"])
-        for sym, pos in positions.items()
-        if pos                                         # skip None (no position)
-            and sym in ACTIVE_SYMBOLS                   # we know this market
-            and (price := fetch_price(sym)) is not None # price available
-    )
+    portfolio_value, cost_basis, unreal = portfolio_sums(px, qty, amt, avg, held_px)
+    equity = float(cash) + portfolio_value
 
-    ticket = max(RISK_FRAC * equity, Decimal(str(MIN_ORDER_USD)))
-    open_n = sum(1 for p in positions.values() if p)
+    ticket = max(_RISK_FRAC_F * equity, _MIN_ORDER_F)
     elapsed = time.time() - start
     logger.debug("snapshot_metrics took %.3f s", elapsed)
 
@@ -113,103 +130,95 @@ def log_heartbeat(m: PortfolioMetrics):
         m.now, m.cash, m.equity, m.open_n, m.ticket, m.unreal
     )
 
-    metrics = PortfolioMetrics(
-        cash=cash,
-        equity=equity,
-        cost_basis=cost_basis,
-        unreal=unreal,
-        ticket=ticket,
-        open_n=open_n,
-        wallet_qty=wallet_qty,
-    )
-    return price_snapshot, metrics
-
-def log_dip_details(price_snapshot: Dict[str, Decimal]):
-    start = time.time()
-    for sym in SYMBOLS:
-        ref_price = ema(sym)
-        if ref_price > 0:
-            ratio = price_snapshot[sym] / ref_price
-        else:
-            ratio = Decimal('NaN')
-        logger.info(
-            "DIPLOG | %-6s current=%.2f | ref=%.2f | ratio=%.4f",
-            sym, price_snapshot[sym], ref_price, ratio
-        )
-    elapsed = time.time() - start
-    logger.debug("log_dip_details took %.3f s", elapsed)
-
 def log_action_summary(
     actions: List[TradeAction],
     filter_reasons: Dict[str, List[str]],
     gen_reasons: Dict[str, List[str]]
 ):
-    # build a map from symbol → human-readable “outcome”
-    summary: Dict[str, str] = {}
-    # first, mark every symbol “filtered” or “no-signal” by default
+    if not logger.isEnabledFor(logging.INFO):
+        return                    # nothing below is needed except for the log line
+    # actions placed win over the filter / no-signal reasons
+    placed = {act.symbol: f"{act.side.upper()} {float(act.qty)} @ {act.price}" for act in actions}
+
+    # one pass over SYMBOLS builds the whole line
+    rows = []
     for sym in SYMBOLS:
-        if sym in filter_reasons:
-            summary[sym] = f"FILTERED ({','.join(filter_reasons[sym])})"
+        if sym in placed:
+            outcome = placed[sym]
+        elif sym in filter_reasons:
+            outcome = f"FILTERED ({','.join(filter_reasons[sym])})"
+        elif sym in gen_reasons:
+            # it was tradeable but generate_actions returned nothing
+            outcome = f"NO-SIGNAL ({','.join(gen_reasons[sym])})"
         else:
-            # if it was tradeable but generate_actions returned nothing
-            summary[sym] = (
-                f"NO-SIGNAL ({','.join(gen_reasons.get(sym, ['?']))})"
-                if sym in gen_reasons
-                else "—"
-            )
-
-    # now overwrite with any actions you actually placed
-    for act in actions:
-        summary[act.symbol] = f"{act.side.upper()} {float(act.qty)} @ {act.price}"
-
-    # log it as one tidy line (or break it out however you like)
-    rows = [f"{sym}: {summary[sym]}" for sym in SYMBOLS]
-    logger.info("SUMMARY BY SYMBOL | %s", " | ".join(rows))
+            outcome = "—"
+        rows.append(f"{sym}: {outcome}")
+    # the action count rides on the same record
+    logger.info("RAW ACTION COUNT | %d\nSUMMARY BY SYMBOL | %s", len(actions), " | ".join(rows))
 
 
 # ──────────────────────────────────────────────────────────────────────────
 # FILTER TRADEABLE SYMBOLS
+_FILTER_FMT = "FILTER | %-6s | $%.4f | ref=%.2f | ratio=%.4f | minlot=%.4f (~$%.2f) %s%s"
+
 def find_tradeable(
-    price_snapshot: Dict[str, Decimal],
+    price_snapshot: Dict[str, float],
     cash: Decimal
-) -> Tuple[List[str], Dict[str, List[str]]]:
+) -> Tuple[List[str], Dict[str, List[str]], Dict[str, float]]:
+    # also returns each symbol's EMA reference, so the entry logic reuses it
     tradeable: List[str] = []
     skipped_reasons: Dict[str, List[str]] = {}
-    threshold = Decimal(str(DIP_THRESHOLD))
 
-    for sym in SYMBOLS:
-        price = price_snapshot[sym]
-        ref = ema(sym)
-        mkt = exchange.markets[sym]
-        minlot = Decimal(str(lot_step(sym)))
-        req = minlot * price
-
-        reasons: List[str] = []
-        if not mkt.get("active", False) or price == 0:
-            reasons.append("inactive")
-        if cash < req:
-            reasons.append("cash<min")
-        if ref <= 0:
-            reasons.append("no-ref")
-        else:
-            ratio = price / ref
-            if ratio > threshold:
-                reasons.append("no-dip")
-
-        if reasons:
-            skipped_reasons[sym] = reasons
-            status, note = "❌", f" ({', '.join(reasons)})"
-        else:
+    syms = list(price_snapshot)
+    n = len(syms)
+    metas = [SYM_META[s] for s in syms]
+    price = np.fromiter((price_snapshot[s] for s in syms), dtype=np.float64, count=n)
+    minlot = np.fromiter((m.min_lot_f for m in metas), dtype=np.float64, count=n)
+    active = np.fromiter((m.active for m in metas), dtype=bool, count=n)
+    req = minlot * price
+
+    # cash-starved: nothing can be bought, so skip the EMA reads and the
+    # per-symbol report – one line says why
+    if not (req[active] <= float(cash)).any():
+        for sym, ok in zip(syms, active.tolist()):
+            skipped_reasons[sym] = ["cash<min"] if ok else ["inactive"]
+        logger.info("FILTER | cash $%.2f covers no min lot (cheapest ~$%.2f) – no entries",
+                    cash, req[active].min(initial=math.inf))
+        return tradeable, skipped_reasons, {}
+
+    ref = np.fromiter((ema_update(s, price_snapshot[s]) for s in syms), dtype=np.float64, count=n)
+
+    # the whole screen as one reject-code array; rule names are only
+    # recovered for rejected symbols
+    codes = screen_codes(price, ref, req, active, float(cash), DIP_THRESHOLD)
+
+    for i, sym in enumerate(syms):
+        code = codes[i]
+        if not code:
             tradeable.append(sym)
-            status, note = "✅", ""
-
-        logger.info(
-            "FILTER | %-6s | $%.4f | minlot=%.4f (~$%.2f) %s%s",
-            sym, price, minlot, req, status, note
-        )
-
-    logger.info("TRADEABLE | %d symbols: %s", len(tradeable), tradeable)
-    return tradeable, skipped_reasons
+        else:
+            skipped_reasons[sym] = [
+                name for bit, name in enumerate(SCREEN_RULES) if code >> bit & 1
+            ]
+
+    # one line per symbol: the dip details and the filter verdict – the
+    # ratios and reason strings are only built when INFO is enabled
+    if logger.isEnabledFor(logging.INFO):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(ref > 0, price / ref, np.nan)
+        lines = []
+        # columns back to Python floats once – %-formatting a NumPy scalar
+        # goes through its own __float__ per field
+        cols = zip(syms, price.tolist(), ref.tolist(), ratio.tolist(), minlot.tolist(), req.tolist())
+        for sym, p, r, q, lot, need in cols:
+            reasons = skipped_reasons.get(sym)
+            status, note = ("❌", f" ({', '.join(reasons)})") if reasons else ("✅", "")
+            lines.append(_FILTER_FMT % (sym, p, r, q, lot, need, status, note))
+        lines.append(f"TRADEABLE | {len(tradeable)} symbols: {tradeable}")
+        # one record (one handler write) per cycle instead of one per symbol
+        logger.info("%s", "\n".join(lines))
+
+    return tradeable, skipped_reasons, dict(zip(syms, ref.tolist()))
 
 
 # ──────────────────────────────────────────────────────────────────────────
@@ -217,26 +226,48 @@ def find_tradeable(
 def generate_all_actions(
     tradeable: List[str],
     positions: Dict[str, dict],
-    last_price: Dict[str, Decimal],
+    last_price: Dict[str, float],
     metrics: PortfolioMetrics,
-    peak_cache: Dict[str, Decimal]
+    peak_cache: Dict[str, Decimal],
+    price_snapshot: Dict[str, float],
+    open_positions: Dict[str, dict],
+    refs: Dict[str, float],
 ) -> Tuple[List[TradeAction], Dict[str, List[str]]]:
-    actions: List[TradeAction] = []
-    gen_skipped: Dict[str, List[str]] = {}
-
+    # exits: every open position in one vectorized screen, whether or not
+    # it passed the entry filter
+    actions, gen_skipped = screen_exits(open_positions, peak_cache, price_snapshot)
+    # counted once per cycle, then kept in step with the actions generated
+    # so far – MAX_OPEN holds across the whole batch
+    open_n = metrics.open_n - len(actions)
+
+    # entries: tradeable symbols without a position.  Serial on purpose:
+    # their candles were prefetched concurrently this cycle, what is left
+    # is GIL-bound Decimal work and the MAX_OPEN count threads through it
     for sym in tradeable:
+        if sym in open_positions:
+            continue
+        if open_n >= MAX_OPEN and positions.get(sym) is None:
+            gen_skipped[sym] = ["max-open-reached"]   # generate_actions' first guard
+            continue
         acts, reasons = generate_actions(
             sym=sym,
             positions=positions,
             last_price=last_price,
-            open_n=metrics.open_n,
+            open_n=open_n,
             cash=metrics.cash,
             equity=metrics.equity,
             peak_cache=peak_cache,
+            px=price_snapshot.get(sym),
+            ref=refs.get(sym),
         )
 
         if acts:
             actions.extend(acts)
+            for act in acts:
+                if act.side == "buy" and positions.get(act.symbol) is None:
+                    open_n += 1
+                elif act.side == "sell":
+                    open_n -= 1
         else:
             # carry forward the actual rule-names
             gen_skipped[sym] = reasons or ["unknown"]
@@ -245,138 +276,330 @@ def generate_all_actions(
 
 # ──────────────────────────────────────────────────────────────────────────
 # EXECUTE TRADE ACTIONS
-def execute_actions(actions: List[TradeAction]):
+def _submit_order(act: TradeAction) -> TradeAction | None:
+    """Send one market order; the action back if the exchange accepted it."""
+    try:
+        order = exchange.create_order(
+            symbol=act.symbol,
+            type="market",
+            side=act.side,
+            amount=float(act.qty)
+        )
+        invalidate_balance()
+        order_id = order.get("id")
+        status = order.get("status")
+        logger.info(
+            "ORDER | %s %s @ %.4f × %.4f → id=%s status=%s",
+            act.side.upper(), act.symbol, act.price, act.qty, order_id, status
+        )
+        return act
+    except Exception as e:
+        logger.exception("Order failed for %s %s: %r", act.side, act.symbol, e)
+        return None
+
+
+# Kraken's batch endpoint takes at most 15 orders per signed request
+_BATCH_MAX = 15
+
+
+def _submit_batch(acts: List[TradeAction]) -> List[TradeAction]:
+    """Send one signed batch; the actions whose orders came back with an id."""
+    try:
+        orders = exchange.create_orders([
+            {"symbol": act.symbol, "type": "market", "side": act.side, "amount": float(act.qty)}
+            for act in acts
+        ])
+    except Exception as e:
+        # not retried one by one: part of the batch may have been accepted
+        logger.exception("Batch order failed for %s: %r", [a.symbol for a in acts], e)
+        return []
+    invalidate_balance()
+    accepted: List[TradeAction] = []
+    for act, order in zip(acts, orders):
+        logger.info(
+            "ORDER | %s %s @ %.4f × %.4f → id=%s status=%s (batch)",
+            act.side.upper(), act.symbol, act.price, act.qty, order.get("id"), order.get("status")
+        )
+        if order.get("id"):
+            accepted.append(act)
+    return accepted
+
+
+def _batch_groups(actions: List[TradeAction]) -> List[List[TradeAction]]:
+    # spot AddOrderBatch only takes orders on one pair, and a cycle makes at
+    # most one action per pair – so on spot every group is a single and the
+    # batch path only runs against the futures endpoint (SIM), which mixes
+    # symbols freely
+    if exchange.id == "krakenfutures":
+        return [actions]
+    groups: Dict[str, List[TradeAction]] = {}
     for act in actions:
-        try:
-            order = exchange.create_order(
-                symbol=act.symbol,
-                type="market",
-                side=act.side,
-                amount=float(act.qty)
-            )
-            order_id = order.get("id")
-            status = order.get("status")
-            logger.info(
-                "ORDER | %s %s @ %.4f × %.4f → id=%s status=%s",
-                act.side.upper(), act.symbol, act.price, act.qty, order_id, status
-            )
-        except Exception as e:
-            logger.exception("Order failed for %s %s: %r", act.side, act.symbol, e)
+        groups.setdefault(act.symbol, []).append(act)
+    return list(groups.values())
+
+
+def execute_actions(actions: List[TradeAction]) -> List[TradeAction]:
+    """Send the cycle's orders; returns the actions the exchange accepted."""
+    # Orders that can share one signed batch request go out together;
+    # the rest – all of them without createOrders – are sent one by one.
+    groups = _batch_groups(actions) if exchange.has.get("createOrders") else [[a] for a in actions]
+    accepted: List[TradeAction] = []
+    singles: List[TradeAction] = []
+    for group in groups:
+        if len(group) < 2:
+            singles.extend(group)
+            continue
+        for i in range(0, len(group), _BATCH_MAX):
+            chunk = group[i:i + _BATCH_MAX]
+            if len(chunk) > 1:
+                accepted.extend(_submit_batch(chunk))
+            else:
+                singles.extend(chunk)
+    # Orders are independent, but Kraken rejects private calls whose nonces
+    # arrive out of order – overlap them only when ORDER_CONCURRENCY allows.
+    if ORDER_CONCURRENCY > 1 and len(singles) > 1:
+        with ThreadPoolExecutor(max_workers=ORDER_CONCURRENCY) as pool:
+            results = list(pool.map(_submit_order, singles))
+    else:
+        results = [_submit_order(act) for act in singles]
+    accepted.extend(act for act in results if act is not None)
+    return accepted
 
 # ──────────────────────────────────────────────────────────────────────────
 # HOUSEKEEPING: RECORD AND UPDATE POSITIONS
 def housekeeping(
     actions: List[TradeAction],
-    last_trade_id: int,
+    last_trade_id: str | None,
     positions: Dict[str, dict],
-    peak_cache: Dict[str, Decimal]
-) -> int:
+    peak_cache: Dict[str, Decimal],
+    open_positions: Dict[str, dict],
+) -> str | None:
     new_trade_id = append_new_trades(last_trade_id)
     for act in actions:
         if act.side == "buy":
-            positions[act.symbol] = {
+            positions[act.symbol] = open_positions[act.symbol] = {
                 "amount": act.qty,
                 "entry": act.price,
+                "avg_price": act.price,
                 "sl": act.sl,
                 "tp": act.tp,
             }
             peak_cache[act.symbol] = act.price
         elif act.side == "sell":
             positions.pop(act.symbol, None)
+            open_positions.pop(act.symbol, None)
             peak_cache.pop(act.symbol, None)
     return new_trade_id
 
+# ──────────────────────────────────────────────────────────────────────────
+# ADAPTIVE POLLING
+def next_poll_interval(price_snapshot: Dict[str, float]) -> float:
+    """
+    Seconds to sleep before the next cycle, driven by the most volatile symbol.
+
+    At 1-min ATR/price == POLL_VOL_REF the bot sleeps POLL_INTERVAL; quieter
+    markets stretch that, busier ones shorten it, within [POLL_MIN, POLL_MAX].
+    """
+    vol = 0.0
+    for sym, price in price_snapshot.items():
+        a = atr(sym)                     # same candles the strategy just used
+        if a and price:
+            vol = max(vol, float(a) / float(price))
+    if not vol:
+        return POLL_INTERVAL
+    return min(max(POLL_INTERVAL * POLL_VOL_REF / vol, POLL_MIN), POLL_MAX)
+
+def _price_buckets(symbols: List[str]) -> List[List[str]]:
+    # Ring of symbol buckets: each cycle refreshes one bucket and trades on
+    # the cached prices of the rest, so REST ticker load per cycle stays
+    # bounded as SYMBOLS grows.
+    buckets = [symbols[i::PRICE_BUCKETS] for i in range(PRICE_BUCKETS)]
+    return [b for b in buckets if b]
+
+
+def _trigger_bands(
+    open_positions: Dict[str, dict],
+    price_snapshot: Dict[str, float],
+) -> Dict[str, Tuple[float, float]]:
+    # the prices at which the next cycle could act: stop / target for open
+    # positions, this cycle's dip level for the rest
+    bands = {s: (p * DIP_THRESHOLD, math.inf) for s, p in price_snapshot.items()}
+    for sym, pos in open_positions.items():
+        sl, tp = pos.get("sl"), pos.get("tp")
+        bands[sym] = (
+            -math.inf if sl is None else float(sl),
+            math.inf if tp is None else float(tp),
+        )
+    return bands
+
+
+def _timed_fetch_prices(symbols: List[str]) -> Tuple[Dict[str, float], float]:
+    t0 = time.monotonic()
+    return fetch_prices(symbols), time.monotonic() - t0
+
 # ──────────────────────────────────────────────────────────────────────────
 # MAIN LOOP
 
-def main_loop():
-    positions = initialize_positions()
+def main_loop(rebuild: bool = False):
+    nas_mirror.start()
+    warm_up_kernels()
+    # futures symbols in SIM mode don't exist on the spot WS feed
+    if MODE != "SIM":
+        ws_cache.start(SYMBOLS)
+        ws_cache.start_private()
+    # inactive / delisted markets never reach fetch_tickers or the filters
+    live = live_symbols(SYMBOLS)
+    if dead := sorted(set(SYMBOLS) - set(live)):
+        logger.warning("Dropping dead symbols: %s", dead)
+    # one batched price fetch, shared by position adoption and the universe check
+    last_price: Dict[str, float] = fetch_prices(live)
+
+    state = None if rebuild else load_bot_state()
+    cached, peaks, last_trade_id = state or ({}, {}, None)
+    positions = initialize_positions(cached, prices=last_price)
     peak_cache = initialize_peak_cache(positions)
-    last_price: Dict[str, Decimal] = {}
+    # trailing peaks survive a restart for positions that were restored as is
+    peak_cache.update({s: p for s, p in peaks.items() if s in cached and positions.get(s) is cached[s]})
+    # open positions only, mirrored by housekeeping, so per-cycle metrics
+    # never have to scan past the None placeholders in `positions`
+    open_positions: Dict[str, dict] = {s: p for s, p in positions.items() if p}
     ACTIVE_SYMBOLS: list[str] = []
-    last_trade_id = append_new_trades(None)
+    last_trade_id = append_new_trades(last_trade_id)
 
-    for sym in SYMBOLS:
-        price = fetch_price(sym)
-        if price is None:
+    for sym in live:
+        if sym not in last_price:
             logger.debug("%s skipped – no ticker", sym)
             continue
-        last_price[sym] = price
         ACTIVE_SYMBOLS.append(sym)
 
     if not ACTIVE_SYMBOLS:
         logger.critical("No tradeable symbols left – aborting.")
         sys.exit(1)
 
+    buckets = _price_buckets(ACTIVE_SYMBOLS)
+    price_cache: Dict[str, float] = dict(last_price)
+    price_ts: Dict[str, float] = dict.fromkeys(price_cache, time.time())
+    tick = 0
+    prices_f = None                      # price fetch prefetched during the last sleep
+    cycle_times: deque[float] = deque(maxlen=120)
+
     logger.info("▶ bot online – risk %.2f%%/trade", RISK_FRAC * 100)
 
+    # names the loop body calls every cycle, bound once as locals
+    wall, sleep, strftime, gmtime = time.time, time.sleep, time.strftime, time.gmtime
+    submit = PUBLIC_POOL.submit
+    info = logger.info
+
+    def price_targets() -> List[str]:
+        # with the ticker stream up every price is an in-memory read, so the
+        # whole universe is refreshed; the REST ring only bounds polling
+        return ACTIVE_SYMBOLS if ws_cache.live() else buckets[tick % len(buckets)]
+
     while True:
-        loop_start = time.time()
+        loop_start = wall()
         try:
-            # 1) Metrics snapshot
-            cash   = account_cash()
-            bal    = exchange.fetch_balance()
-            equity = cash + sum(
-                Decimal(str(bal.get(sym.split("/")[0], {}).get("total", 0))) *
-                (fetch_price(sym) or Decimal("0"))
-                for sym in ACTIVE_SYMBOLS
-            )
-            open_n = sum(1 for p in positions.values() if p)
-            ticket = min(RISK_FRAC * equity, cash)
-            unreal = sum(
-                pos["amount"] * (price - pos["avg_price"])
-                for sym, pos in positions.items()
-                if pos                                         # skip None (no position)
-                    and sym in ACTIVE_SYMBOLS                   # we know this market
-                    and (price := fetch_price(sym)) is not None # price available
-            )
+            if refresh_markets():
+                # hourly re-check of the universe against the fresh markets;
+                # a symbol that comes back has no last_price yet – it reports
+                # "no-ref" until the end of its first priced cycle seeds one
+                ACTIVE_SYMBOLS = live_symbols(SYMBOLS)
+                if dead := sorted(set(SYMBOLS) - set(ACTIVE_SYMBOLS)):
+                    logger.warning("Dropping dead symbols: %s", dead)
+                for sym in set(price_cache) - set(ACTIVE_SYMBOLS):
+                    price_cache.pop(sym)
+                    price_ts.pop(sym)
+                buckets = _price_buckets(ACTIVE_SYMBOLS) or buckets
+
+            # 1) Metrics snapshot – one batched price fetch for the whole cycle,
+            #    overlapped with the cycle's single (private) balance call
+            if prices_f is None:
+                prices_f = submit(_timed_fetch_prices, price_targets())
+            bal    = cycle_balance()
+            cash   = account_cash(bal)
+            pending, prices_f = prices_f, None
+            fresh, fetch_s = pending.result()
+            tick  += 1
+            now_ts = wall()
+            price_cache.update(fresh)
+            price_ts.update(dict.fromkeys(fresh, now_ts))
+            prices = {
+                s: p for s, p in price_cache.items()
+                if now_ts - price_ts[s] <= MAX_STALENESS
+            }
+            use_cycle_prices(prices)
+
+            price_snapshot, snap_metrics = snapshot_metrics(open_positions, prices, bal, cash)
             metrics = SimpleNamespace(
-                now=datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                now=strftime("%Y-%m-%d %H:%M:%S", gmtime(loop_start)),
                 cash=cash,
-                equity=equity,
-                open_n=open_n,
-                ticket=ticket,
-                unreal=unreal,
+                equity=snap_metrics.equity,
+                open_n=snap_metrics.open_n,
+                ticket=min(_RISK_FRAC_F * snap_metrics.equity, float(cash)),
+                unreal=snap_metrics.unreal,
             )
-
-
-            price_snapshot, snap_metrics = snapshot_metrics(positions)
             #snap = SimpleNamespace(**snap_dict)
-            # 2) Heartbeat + dip details
+            # 2) Heartbeat (dip details are logged by the filter below)
             log_heartbeat(metrics)
-            log_dip_details(price_snapshot)
             logger.debug("Last prices: %s", last_price)
 
-            # 3) Filter 
-            tradeable, filter_reasons = find_tradeable(price_snapshot, metrics.cash)
+            # 3) Filter – candles the WS feed lacks are fetched in parallel first
+            prefetch_candles(list(price_snapshot))
+            tradeable, filter_reasons, refs = find_tradeable(price_snapshot, metrics.cash)
 
             # 4) Generate
             actions, gen_reasons = generate_all_actions(
-                tradeable, positions, last_price, metrics, peak_cache
+                tradeable, positions, last_price, metrics, peak_cache, price_snapshot,
+                open_positions, refs,
                 )
-            
-            logger.info("RAW ACTION COUNT | %d", len(actions))
+
             log_action_summary(actions, filter_reasons, gen_reasons)
 
             # 5) Execute
-            execute_actions(actions)
+            placed = execute_actions(actions)
 
-            # 6) Record and update
-            last_trade_id = housekeeping(actions, last_trade_id, positions, peak_cache)
+            # 6) Record and update – only the orders the exchange took
+            last_trade_id = housekeeping(placed, last_trade_id, positions, peak_cache, open_positions)
+            save_bot_state(open_positions, peak_cache, last_trade_id)
 
             # 7) Prepare for next cycle
-            last_price = price_snapshot.copy()
-            elapsed = time.time() - loop_start
-            logger.info("Cycle complete in %.2f s; sleeping %d s", elapsed, POLL_INTERVAL)
-            time.sleep(POLL_INTERVAL)
+            # in place: no new dict per cycle, and symbols missing from this
+            # snapshot keep their previous reference price
+            last_price.update(price_snapshot)
+            period = next_poll_interval(price_snapshot)
+            elapsed = wall() - loop_start
+            # drift-corrected: the period runs from this cycle's start; an
+            # overrun skips to the next whole period instead of piling up
+            sleep_s = period * math.ceil(elapsed / period) - elapsed
+            info("Cycle complete in %.2f s; sleeping %.0f s", elapsed, sleep_s)
+            cycle_times.append(elapsed)
+            if logger.isEnabledFor(logging.DEBUG):
+                p50, p95 = np.percentile(cycle_times, (50, 95))
+                logger.debug("Cycle time p50 %.3f s | p95 %.3f s (last %d)", p50, p95, len(cycle_times))
+            # start the next price fetch one fetch-latency before waking, so
+            # it lands as the sleep ends instead of after it
+            lead = min(fetch_s, sleep_s)
+            if ws_cache.live():
+                # event-driven wake-up: a ticker crossing a stop, target or
+                # dip level ends the sleep early (but not before POLL_MIN)
+                ws_cache.set_triggers(_trigger_bands(open_positions, price_snapshot))
+                floor = min(POLL_MIN, sleep_s - lead)
+                sleep(floor)
+                if ws_cache.wait_trigger(sleep_s - lead - floor):
+                    info("Price trigger – starting the next cycle early")
+            else:
+                sleep(sleep_s - lead)
+            prices_f = submit(_timed_fetch_prices, price_targets())
+            sleep(lead)
 
         except KeyboardInterrupt:
-            logger.warning("⏹ stopped – open positions: %s", {s: p for s, p in positions.items() if p})
+            logger.warning("⏹ stopped – open positions: %s", open_positions)
+            shutdown()
             break
         except Exception:
             logger.exception("Unhandled error in main loop")
-            time.sleep(POLL_INTERVAL)
+            sleep(POLL_INTERVAL)
 
 
 if __name__ == "__main__":
-    main_loop()
+    # --rebuild: ignore the saved state and reconstruct positions from history
+    main_loop(rebuild="--rebuild" in sys.argv[1:])
@@ -1,9 +1,14 @@
 # ledger.py
 
+import atexit
 import csv
+import hashlib
+import json
+import time
 from decimal import Decimal
-from config import TRADE_CSV, SYMBOLS, MIN_USD_EXPOS, TP_ATR_MULT, SL_ATR_MULT
-from exchange_client import exchange, fetch_price, open_position_from_history
+from operator import itemgetter
+from config import TRADE_CSV, TRADE_STATE, BOT_STATE, STATE_TTL, MODE, SYMBOLS, BASE_ASSET, MIN_USD_EXPOS, TP_ATR_MULT, SL_ATR_MULT, TRAIL_PCT
+from exchange_client import exchange, fetch_balance, fetch_prices, live_symbols, open_position_from_history, write_atomic, PUBLIC_POOL
 from indicators import atr
 import logging
 logger = logging.getLogger(__name__)
@@ -11,40 +16,213 @@ logger = logging.getLogger(__name__)
 
 DEC_TOL = Decimal("1e-8")
 
+TRADE_HEADER = ["id","time","symbol","side","qty","price","cost","fee","order"]
+
+
+def _load_trade_hwm() -> int | None:
+    try:
+        return json.loads(TRADE_STATE.read_text())["last_trade_ts"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+# timestamp (ms) of the newest trade handed to the trade log, kept across
+# restarts (persisted by TradeLogger.flush); read on first use, once
+# nas_mirror.start() has seeded TRADE_STATE on a fresh host
+_trade_hwm: int | None = None
+_hwm_loaded = False
+
+
+class TradeLogger:
+    """
+    The trade CSV behind one long-lived, buffered handle.
+
+    Rows reach the file every FLUSH_ROWS rows or FLUSH_SECS seconds and at
+    exit, not once per cycle.  The persisted high-water mark only advances
+    with a flush, so rows lost in a crash are fetched again on restart.
+    """
+    FLUSH_ROWS = 50
+    FLUSH_SECS = 60.0
+
+    def __init__(self, path):
+        self.path = path
+        self._f = None
+        self._writer = None
+        self._pending = 0             # rows written since the last flush
+        self._first = 0.0             # monotonic time the oldest of them came in
+        self._hwm: int | None = None
+
+    def _open(self) -> None:
+        # opened on first use, so importing ledger never creates the file
+        self._f = self.path.open("a", newline="", buffering=1 << 20)
+        self._writer = csv.writer(self._f)
+        if self._f.tell() == 0:
+            self._writer.writerow(TRADE_HEADER)
+        atexit.register(self.close)
+
+    def append(self, rows: list[list], hwm: int) -> None:
+        if self._f is None:
+            self._open()
+        if not self._pending:
+            self._first = time.monotonic()
+        self._writer.writerows(rows)
+        self._pending += len(rows)
+        self._hwm = hwm
+        self.maybe_flush()
+
+    def maybe_flush(self) -> None:
+        if self._pending and (
+            self._pending >= self.FLUSH_ROWS or time.monotonic() - self._first >= self.FLUSH_SECS
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self._f.flush()
+        self._pending = 0
+        try:
+            write_atomic(TRADE_STATE, json.dumps({"last_trade_ts": self._hwm}))
+        except OSError as exc:
+            logger.warning("Could not save %s: %s", TRADE_STATE, exc)
+
+    def close(self) -> None:
+        self.flush()
+        self._f.close()
+
+
+TRADE_LOGGER = TradeLogger(TRADE_CSV)
+_by_ts = itemgetter("timestamp")
+
+
+def _fetch_trades_since(since: int | None) -> list[dict]:
+    # every fill after `since`, paged with `ofs` like fetch_all_trades: the
+    # mark jumps to the newest one, so a fill left on an unread page would
+    # never be logged.  Without a mark only the newest page is read.
+    trades: list[dict] = []
+    seen: set[str] = set()
+    while True:
+        page = exchange.fetch_my_trades(since=since, limit=50, params={"ofs": len(trades)})
+        fresh = [t for t in page if t["id"] not in seen]
+        trades.extend(fresh)
+        seen.update(t["id"] for t in fresh)
+        # a short page is the last one; a page with nothing new means the
+        # endpoint ignores `ofs`
+        if since is None or len(page) < 50 or not fresh:
+            return trades
+
+
 def append_new_trades(last_id=None):
-    """Append new trades to CSV and return latest trade id."""
-    recent = exchange.fetch_my_trades(limit=50)
+    """
+    Append new trades to CSV and return latest trade id.
+
+    Only fills after the timestamp high-water mark are requested (`since=`,
+    every page of them), so a quiet cycle downloads nothing and a restart
+    does not re-append the last 50; `last_id` only dedupes when no
+    high-water mark exists yet.
+    """
+    global _trade_hwm, _hwm_loaded
+    if not _hwm_loaded:
+        _trade_hwm, _hwm_loaded = _load_trade_hwm(), True
+    TRADE_LOGGER.maybe_flush()            # rows left over from earlier cycles
+    since = None if _trade_hwm is None else _trade_hwm + 1
+    recent = _fetch_trades_since(since)
     if not recent:
         return last_id
-    recent.sort(key=lambda t: t["id"])
-    with TRADE_CSV.open("a", newline="") as f:
-        writer = csv.writer(f)
-        if f.tell() == 0:
-            writer.writerow(["id","time","symbol","side","qty","price","cost","fee","order"])
-        for t in recent:
-            if last_id is not None and t["id"] <= last_id:
-                continue
-            writer.writerow([
-                t["id"], t["datetime"], t["symbol"], t["side"],
-                t["amount"], t["price"], t["cost"],
-                t["fee"]["cost"], t["order"]
-            ])
-    return recent[-1]["id"]
-
-
-def initialize_positions() -> dict[str, dict | None]:
+    hwm = _trade_hwm
+    if hwm is None and max(recent, key=_by_ts)["id"] == last_id:
+        return last_id                    # nothing newer than what is logged
+    # filtered first, so only the new tail is sorted; Kraken's `start` is
+    # whole seconds – drop the part of that second already logged
+    new = [t for t in recent if (t["timestamp"] > hwm if hwm is not None else t["id"] != last_id)]
+    if not new:
+        return last_id
+    new.sort(key=_by_ts)
+    _trade_hwm = new[-1]["timestamp"]
+    TRADE_LOGGER.append([
+        [t["id"], t["datetime"], t["symbol"], t["side"],
+         t["amount"], t["price"], t["cost"], t["fee"]["cost"], t["order"]]
+        for t in new
+    ], _trade_hwm)
+    return new[-1]["id"]
+
+
+def _state_key() -> str:
+    # a state saved under another universe or exit config is not reused
+    cfg = [MODE, SYMBOLS, str(TP_ATR_MULT), str(SL_ATR_MULT), TRAIL_PCT]
+    return hashlib.sha1(json.dumps(cfg).encode()).hexdigest()[:16]
+
+
+_saved_state: str | None = None
+
+
+def save_bot_state(open_positions: dict[str, dict], peak_cache: dict, last_trade_id) -> None:
+    """Checkpoint open positions, trailing peaks and the last trade id (atomic, only on change)."""
+    global _saved_state
+    text = json.dumps({
+        "key": _state_key(),
+        "last_trade_id": last_trade_id,
+        "positions": {s: {k: str(v) for k, v in p.items()} for s, p in open_positions.items()},
+        "peaks": {s: str(v) for s, v in peak_cache.items()},
+    })
+    if text == _saved_state:
+        return
+    try:
+        write_atomic(BOT_STATE, text)
+        _saved_state = text
+    except OSError as exc:
+        logger.warning("Could not save %s: %s", BOT_STATE, exc)
+
+
+def load_bot_state() -> tuple[dict[str, dict], dict[str, Decimal], str | None] | None:
+    """
+    (positions, peaks, last_trade_id) from the last run, or None when the
+    file is missing, older than STATE_TTL or was written under another config.
+    """
+    try:
+        if time.time() - BOT_STATE.stat().st_mtime > STATE_TTL:
+            logger.info("State cache miss: %s is older than %ds", BOT_STATE, STATE_TTL)
+            return None
+        data = json.loads(BOT_STATE.read_text())
+        if data["key"] != _state_key():
+            logger.info("State cache miss: saved under a different config")
+            return None
+        positions = {
+            s: {k: Decimal(v) for k, v in p.items()} for s, p in data["positions"].items()
+        }
+        peaks = {s: Decimal(v) for s, v in data["peaks"].items()}
+        return positions, peaks, data["last_trade_id"]
+    except (OSError, ValueError, KeyError, TypeError, ArithmeticError):
+        logger.info("State cache miss: no usable %s", BOT_STATE)
+        return None
+
+
+def initialize_positions(
+    cached: dict[str, dict] | None = None,
+    prices: dict[str, float] | None = None,
+) -> dict[str, dict | None]:
     """
     Build `positions` using wallet balances *and* trade history,
     skipping dust, zero-price markets, and tiny exposures.
+
+    A `cached` position (see load_bot_state) whose amount still matches the
+    wallet is taken as is – no history walk, no ATR fetch for that symbol.
+    Pass the caller's `prices` snapshot to skip the ticker fetch.
     """
+    cached = cached or {}
+    restored = 0
     positions: dict[str, dict | None] = {}
-    bal        = exchange.fetch_balance()
+    rebuild: list[tuple[str, Decimal, float]] = []   # (sym, wallet qty, spot)
+    bal        = fetch_balance()
+    if prices is None:
+        prices = fetch_prices(live_symbols(SYMBOLS))   # one batched ticker call, live markets only
+    totals     = bal.get("total") or {}        # {asset: total}
 
     for sym in SYMBOLS:
-        base       = sym.split("/")[0]
-        wallet_qty = Decimal(str(bal.get(base, {}).get("total", 0)))
+        base       = BASE_ASSET[sym]
+        wallet_qty = Decimal(str(totals.get(base) or 0))
 
-        spot = fetch_price(sym) or 0
+        spot = prices.get(sym) or 0
         if spot is None:          # NEW
             continue              # unsupported symbol → just ignore
         if spot == 0:
@@ -52,11 +230,24 @@ def initialize_positions() -> dict[str, dict | None]:
             positions[sym] = None
             continue
 
-        usd_value = wallet_qty * spot
+        usd_value = float(wallet_qty) * spot
         if usd_value < MIN_USD_EXPOS:    # dust filter
             positions[sym] = None
             continue
 
+        pos = cached.get(sym)
+        if pos is not None and abs(pos["amount"] - wallet_qty) <= DEC_TOL:
+            positions[sym] = pos          # wallet unchanged since the last save
+            restored += 1
+            continue
+        positions[sym] = None             # keeps SYMBOLS order; filled in below
+        rebuild.append((sym, wallet_qty, spot))
+
+    # the ATR candles are public – all fetched on the pool at once while the
+    # (nonce-ordered, so strictly serial) history pages come in below
+    atr_f = {sym: PUBLIC_POOL.submit(atr, sym) for sym, _, _ in rebuild}
+
+    for sym, wallet_qty, spot in rebuild:
         # --- History reconstruction ----------------------------------------
         hist_qty, hist_entry = open_position_from_history(sym)
         hist_qty     = hist_qty or 0
@@ -73,7 +264,7 @@ def initialize_positions() -> dict[str, dict | None]:
         avg_price = blended_price if blended_price is not None else hist_entry
 
         # --- Protective levels ---------------------------------------------
-        a  = atr(sym) or avg_price * Decimal("0.01")     # fallback: 1 % of price
+        a  = atr_f[sym].result() or avg_price * Decimal("0.01")     # fallback: 1 % of price
         sl = avg_price - a * SL_ATR_MULT
         tp = avg_price + a * TP_ATR_MULT
 
@@ -84,6 +275,10 @@ def initialize_positions() -> dict[str, dict | None]:
             "tp": tp
         }
 
+    if cached:
+        held = sum(1 for p in positions.values() if p)
+        logger.info("State cache hit: %d position(s) restored, %d rebuilt from history",
+                    restored, held - restored)
     return positions
 
 def _to_dec(x) -> Decimal:
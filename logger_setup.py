@@ -1,12 +1,68 @@
 # logger_setup.py
+import atexit
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import time
+from decimal import Decimal
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from config import LOG_PATH
 
 
+def _utc_formatter(datefmt: str) -> logging.Formatter:
+    # record times are formatted with time.strftime on a struct_time; UTC
+    # matches the heartbeat line
+    fmt = logging.Formatter("%(asctime)s %(levelname)s: %(message)s", datefmt)
+    fmt.converter = time.gmtime
+    return fmt
+
+
+# argument types that can't change between the call and the listener's write
+_IMMUTABLE_ARGS = {str, int, float, bool, Decimal, type(None)}
+
+
+_listener: QueueListener | None = None
+
+
+def stop_logging() -> None:
+    """Drain the log queue into the handlers and stop the writer thread (idempotent)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves the %-formatting to the listener thread.
+
+    The stock prepare() renders every message on the caller's thread.  The
+    queue here is in-process, so a record whose args are all immutable
+    scalars can cross as is; dicts, lists, arrays and exceptions are still
+    rendered up front, while they show what the caller meant.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if (record.exc_info is None and isinstance(args, tuple)
+                and all(type(a) in _IMMUTABLE_ARGS for a in args)):
+            return record
+        return super().prepare(record)
+
+
 def setup_logger(*, log_path: str, level=logging.DEBUG):
+    global _listener
     root = logging.getLogger()
     root.setLevel(level)
+    # idempotent: a second call (another entry point, a re-import) must not
+    # add a second queue and have every line written twice
+    if any(isinstance(h, _DeferredQueueHandler) for h in root.handlers):
+        return root
+
+    # the format only uses time, level and message – don't have every
+    # record on the trading thread look up its caller frame, thread and process
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
 
     # rotating file handler (with full timestamp in the log line)
     fh = TimedRotatingFileHandler(
@@ -14,19 +70,19 @@ def setup_logger(*, log_path: str, level=logging.DEBUG):
         when="midnight", interval=1, backupCount=7,
         encoding="utf-8"
     )
-    fh.setFormatter(logging.Formatter(
-        "%(asctime)s %(levelname)s: %(message)s",
-        "%Y-%m-%d %H:%M:%S"
-    ))
-    root.addHandler(fh)
+    fh.setFormatter(_utc_formatter("%Y-%m-%d %H:%M:%S"))
 
     # console handler (just show time, level and message)
     ch = logging.StreamHandler()
     ch.setLevel(logging.INFO)
-    ch.setFormatter(logging.Formatter(
-        "%(asctime)s %(levelname)s: %(message)s",
-        datefmt="%H:%M:%S"
-    ))
-    root.addHandler(ch)
+    ch.setFormatter(_utc_formatter("%H:%M:%S"))
+
+    # callers only enqueue; a listener thread does the file writes, so
+    # slow I/O never stalls the trading loop
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(q))
+    _listener = QueueListener(q, fh, ch, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)       # drains the queue before exit
 
     return root
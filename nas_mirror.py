@@ -0,0 +1,124 @@
+# nas_mirror.py
+"""
+Background copy of the local log, trade, state and inventory files to the NAS share.
+
+The log, the trade CSV, the state files and the inventory checkpoints are
+written on local disk (LOCAL_DIR), so a slow or hung mount never reaches
+the trading or the logging thread.  A daemon thread copies whatever changed to MOUNT_DIR every
+MIRROR_INTERVAL seconds, and once more at exit after the log queue drained.
+"""
+import atexit
+import logging
+import os
+import shutil
+import threading
+
+from config import LOCAL_DIR, MOUNT_DIR, MIRROR_INTERVAL, LOG_PATH, TRADE_CSV, TRADE_STATE, BOT_STATE, INVENTORY_DIR
+from logger_setup import stop_logging
+
+logger = logging.getLogger(__name__)
+
+# the log and its rotated copies, the trade CSV, the bot state and the FIFO
+# inventory checkpoints; the CSV's high-water mark (TRADE_STATE) is handled
+# by sync() itself
+_INVENTORY = "inventory_*.json"
+_PATTERNS = (LOG_PATH.name + "*", TRADE_CSV.name, BOT_STATE.name, _INVENTORY)
+
+_lock = threading.Lock()
+_copied: dict[str, tuple[int, int]] = {}    # file name → (mtime_ns, size) last mirrored
+_thread: threading.Thread | None = None
+_stop = threading.Event()
+
+
+def _mirror(src, data: bytes | None = None, sig: tuple[int, int] | None = None) -> bool:
+    # one file to the share via a temp name; `data`/`sig` publish a copy
+    # read earlier instead of the file's current contents
+    dst = MOUNT_DIR / src.name
+    tmp = dst.with_name(dst.name + ".tmp")
+    try:
+        if sig is None:
+            st = src.stat()               # may have rotated away since the glob
+            sig = (st.st_mtime_ns, st.st_size)
+        if _copied.get(src.name) == sig:
+            return True
+        if data is None:
+            shutil.copyfile(src, tmp)
+        else:
+            tmp.write_bytes(data)
+        os.replace(tmp, dst)
+    except OSError as exc:
+        logger.warning("Could not mirror %s to %s: %s", src.name, MOUNT_DIR, exc)
+        return False
+    _copied[src.name] = sig
+    return True
+
+
+def sync() -> None:
+    """Copy every local file that changed since its last mirror (atomically on the share)."""
+    with _lock:
+        # the high-water mark is read before the CSV is copied and published
+        # after it, so the share's mark never runs ahead of the share's rows
+        try:
+            st = TRADE_STATE.stat()
+            hwm = TRADE_STATE.read_bytes(), (st.st_mtime_ns, st.st_size)
+        except OSError:
+            hwm = None
+        csv_ok = True
+        for pattern in _PATTERNS:
+            for src in LOCAL_DIR.glob(pattern):
+                ok = _mirror(src)
+                if src == TRADE_CSV:
+                    csv_ok = ok
+        if hwm is not None and csv_ok:
+            _mirror(TRADE_STATE, *hwm)
+
+
+def _seed_file(path) -> None:
+    src = MOUNT_DIR / path.name
+    shutil.copyfile(src, path)
+    st = src.stat()                       # keep the mtime – BOT_STATE's age is checked on boot
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    logger.info("Seeded %s from %s", path, MOUNT_DIR)
+
+
+def _seed() -> None:
+    # a fresh host continues the share's trade log and state instead of
+    # starting new ones; the CSV and its high-water mark only come as a pair
+    if not TRADE_CSV.exists() and (MOUNT_DIR / TRADE_CSV.name).exists():
+        if (MOUNT_DIR / TRADE_STATE.name).exists():
+            _seed_file(TRADE_STATE)
+        _seed_file(TRADE_CSV)
+    if not BOT_STATE.exists() and (MOUNT_DIR / BOT_STATE.name).exists():
+        _seed_file(BOT_STATE)
+    # each checkpoint stands alone (its inventory and the newest trade in it)
+    for src in MOUNT_DIR.glob(_INVENTORY):
+        if not (INVENTORY_DIR / src.name).exists():
+            _seed_file(INVENTORY_DIR / src.name)
+
+
+def _run() -> None:
+    while not _stop.wait(MIRROR_INTERVAL):
+        try:
+            sync()
+        except Exception:
+            logger.exception("NAS mirror pass failed")
+
+
+def _final_sync() -> None:
+    _stop.set()
+    stop_logging()                        # the last lines reach the log file first
+    sync()
+
+
+def start() -> None:
+    """Seed the local trade, state and inventory files from the share and start the mirror thread once."""
+    global _thread
+    if _thread is not None:
+        return
+    try:
+        _seed()
+    except OSError as exc:
+        logger.warning("Could not seed %s from %s: %s", LOCAL_DIR, MOUNT_DIR, exc)
+    _thread = threading.Thread(target=_run, name="nas-mirror", daemon=True)
+    _thread.start()
+    atexit.register(_final_sync)
@@ -0,0 +1,39 @@
+# settings.py
+"""
+Environment settings, read once at import.
+
+The .env file next to this module is parsed a single time and the values
+are frozen into SETTINGS; everything else imports from here (or via
+config.py) instead of calling os.getenv() again.
+"""
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# point explicitly at your .env file (in the same dir as settings.py)
+load_dotenv(dotenv_path=Path(__file__).parent / ".env")
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    MODE: str
+    API_KEY: str | None
+    API_SECRET: str | None
+    KRAKEN_FUTURES_API: str | None
+    KRAKEN_FUTURES_SECRET: str | None
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        env = os.environ
+        return cls(
+            MODE=env.get("MODE", "LIVE"),
+            API_KEY=env.get("API_KEY"),
+            API_SECRET=env.get("API_SECRET"),
+            KRAKEN_FUTURES_API=env.get("KRAKEN_FUTURES_API"),
+            KRAKEN_FUTURES_SECRET=env.get("KRAKEN_FUTURES_SECRET"),
+        )
+
+
+SETTINGS = Settings.from_env()
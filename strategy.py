@@ -4,6 +4,7 @@ import math
 import logging
 from decimal import Decimal, ROUND_DOWN
 from typing import Dict, List, Literal, NamedTuple, Tuple
+import numpy as np
 from indicators import trend_4h_ema
 
 from config import (
@@ -13,11 +14,17 @@ from config import (
     SL_ATR_MULT,
     TP_ATR_MULT,
 )
-from exchange_client import fetch_price, exchange
-from indicators import ema, atr, pos_size, update_depth_ema
+from exchange_client import fetch_price, to_decimal, SYM_META
+from indicators import ema_update, atr, pos_size, update_depth_ema, exit_levels
 
 logger = logging.getLogger(__name__)
 
+# config values as Decimals, built once instead of per symbol per cycle
+_TRAIL_KEEP    = 1 - Decimal(str(TRAIL_PCT)) / 100
+_TRAIL_KEEP_F  = float(_TRAIL_KEEP)          # the vectorized exit screen's view
+_SL_MULT_F     = float(SL_ATR_MULT)           # the entry path's float views
+_TP_MULT_F     = float(TP_ATR_MULT)
+
 Side = Literal["buy", "sell"]
 
 class TradeAction(NamedTuple):
@@ -42,58 +49,61 @@ def _round_qty(qty: Decimal, minlot: Decimal) -> Decimal:
 def filter_tradeable(
     symbols: List[str],
     positions: Dict[str, dict],
-    last_price: Dict[str, Decimal],
+    last_price: Dict[str, float],
     cash: Decimal,
+    prices: Dict[str, float] | None = None,
 ) -> List[str]:
-    """Return symbols that pass trend, dip, cash, and order-book depth filters."""
+    """
+    Return symbols that pass trend, dip, cash, and order-book depth filters.
+
+    `prices` is the cycle's batched snapshot; without it each symbol is
+    priced through fetch_price.
+    """
     tradeable: List[str] = []
+    debug = logger.isEnabledFor(logging.DEBUG)      # checked once, not per line
+    cash_f = float(cash)
 
     for sym in symbols:
-        price = fetch_price(sym)
-        if price is None:
-            logger.debug("%s skipped – no ticker", sym)
+        px = fetch_price(sym) if prices is None else prices.get(sym)
+        if px is None:
+            if debug:
+                logger.debug("%s skipped – no ticker", sym)
             continue
 
-        # compute minimum notional
-        mkt = exchange.markets[sym]
-        minlot = Decimal(mkt["limits"]["amount"]["min"] or "1e-8")
-        min_notional = minlot * price
-
-        reasons: List[str] = []
-
-        # 1) trend filter: only buy if price is above its 50×4h-EMA
-        trend_val = Decimal(str(trend_4h_ema(sym, period=50)))
-        if price < trend_val:
-            reasons.append("below-4h-EMA")
-
-        # 2) ensure sufficient cash to meet min notional
-        if cash < min_notional:
-            reasons.append("cash<min")
-
-        # 3) dip filter
-        if price > last_price[sym] * Decimal(str(DIP_THRESHOLD)):
-            reasons.append("no-dip")
-
-        # 4) order-book depth filter
-        if update_depth_ema(sym) < 50:
-            reasons.append("thin-book")
+        # 1) cash vs min notional, 2) dip – plain float compares; a symbol
+        # failing either is dropped before any candle or book is touched
+        min_notional = SYM_META[sym].min_lot_f * px
+        short_cash = cash_f < min_notional
+        last = last_price.get(sym)
+        no_ref = last is None
+        no_dip = not no_ref and px > last * DIP_THRESHOLD
+        if short_cash or no_ref or no_dip:
+            if debug:
+                reasons = ["cash<min"] * short_cash + ["no-ref"] * no_ref + ["no-dip"] * no_dip
+                logger.debug("%s filtered out (%s)", sym, ", ".join(reasons))
+            continue
 
-        if reasons:
-            logger.debug(
-                "%s filtered out (%s)",
-                sym,
-                ", ".join(reasons)
-            )
+        # 3) trend filter: only buy if price is above its 50×4h-EMA
+        trend_val = trend_4h_ema(sym, period=50)
+        if px < trend_val:
+            reason = "below-4h-EMA"
+        # 4) order-book depth filter – the costliest gate, reached last
+        elif update_depth_ema(sym) < 50:
+            reason = "thin-book"
         else:
-            logger.debug(
-                "%s passed filters – price: %.2f, 4h-EMA: %.2f, last: %.2f, min_notional: %.2f",
-                sym,
-                price,
-                trend_val,
-                last_price[sym],
-                min_notional,
-            )
+            if debug:
+                logger.debug(
+                    "%s passed filters – price: %.2f, 4h-EMA: %.2f, last: %.2f, min_notional: %.2f",
+                    sym,
+                    px,
+                    trend_val,
+                    last,
+                    min_notional,
+                )
             tradeable.append(sym)
+            continue
+        if debug:
+            logger.debug("%s filtered out (%s)", sym, reason)
 
     return tradeable
 
@@ -101,13 +111,18 @@ def filter_tradeable(
 def generate_actions(
     sym: str,
     positions: Dict[str, dict],
-    last_price: Dict[str, Decimal],
+    last_price: Dict[str, float],
     open_n: int,
     cash: Decimal,
-    equity: Decimal,
+    equity: float,
     peak_cache: Dict[str, Decimal],
+    px: float | None = None,
+    ref: float | None = None,
 ) -> Tuple[List[TradeAction], List[str]]:
     """
+    `px` is the cycle's snapshot price; it is only fetched when omitted.
+    `ref` is the EMA the cycle's screen already computed at that price.
+
     Returns:
       - actions: List[TradeAction] to send
       - reasons: if actions==[], concrete rule-names why no trade was generated
@@ -115,10 +130,12 @@ def generate_actions(
     actions: List[TradeAction] = []
     reasons: List[str] = []
 
-    price = fetch_price(sym)
-    if price is None:
+    if px is None:
+        px = fetch_price(sym)
+    if px is None:
         reasons.append("no-price")
         return actions, reasons
+    price = to_decimal(px)             # loop prices are float; SL/TP/qty are Decimal
 
     pos = positions.get(sym)
 
@@ -128,32 +145,39 @@ def generate_actions(
         if open_n >= MAX_OPEN:
             reasons.append("max-open-reached")
         else:
-            # 2) dip vs last cycle
-            dip_ok = price <= last_price[sym] * Decimal(str(DIP_THRESHOLD))
-            if not dip_ok:
+            # 2) dip vs last cycle – checked first, the EMA may read candles;
+            # a symbol (re-)added since has no reference until the cycle ends
+            last = last_price.get(sym)
+            dip_ok = last is not None and px <= last * DIP_THRESHOLD
+            ema_val = 0.0
+            if last is None:
+                reasons.append("no-ref")
+            elif not dip_ok:
                 reasons.append("no-dip")
-            # 3) under EMA
-            ema_val = ema(sym)
-            if ema_val <= 0:
-                reasons.append("no-ema")
-            elif price >= ema_val:
-                reasons.append("above-ema")
-
-            # only size if both dip_ok and ema_val>0
-            if dip_ok and ema_val > 0 and price < ema_val:
+            else:
+                # 3) under EMA
+                ema_val = float(ema_update(sym, px)) if ref is None else ref
+                if ema_val <= 0:
+                    reasons.append("no-ema")
+                elif px >= ema_val:
+                    reasons.append("above-ema")
+
+            # only size if both dip_ok and ema_val>0; the levels and the
+            # sizing are float math, Decimal only for what goes on the order
+            if dip_ok and ema_val > 0 and px < ema_val:
                 # 4) compute SL/TP
-                vol = atr(sym)
-                sl = price - vol * Decimal(str(SL_ATR_MULT))
-                tp = price + vol * Decimal(str(TP_ATR_MULT))
+                vol = float(atr(sym) or 0)
+                sl_f = px - vol * _SL_MULT_F
+                tp_f = px + vol * _TP_MULT_F
 
                 # 5) sizing
-                raw_qty = pos_size(price, sl, equity)
-                max_qty = cash / price
-                qty = Decimal(min(raw_qty, max_qty))
+                raw_qty = pos_size(px, sl_f, equity)
+                qty_f = min(raw_qty, float(cash) / px)
 
                 # 6) round to minlot
-                minlot = Decimal(exchange.markets[sym]["limits"]["amount"]["min"] or "1e-8")
-                qty = _round_qty(qty, minlot)
+                minlot = SYM_META[sym].min_lot
+                qty = _round_qty(to_decimal(qty_f), minlot)
+                sl, tp = to_decimal(sl_f), to_decimal(tp_f)
 
                 if qty >= minlot:
                     actions.append(
@@ -168,8 +192,10 @@ def generate_actions(
 
     # ── EXIT ─────────────────────────────────────────────────────────────
     elif pos:
-        logger.debug("%s evaluating exit – price: %.2f | TP: %.2f | SL: %.2f",
-                     sym, price, pos.get("tp"), pos.get("sl"))
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("%s evaluating exit – price: %.2f | TP: %.2f | SL: %.2f",
+                         sym, price, pos.get("tp"), pos.get("sl"))
 
         # 1) compute a safe “entry price” fallback
         entry_price = (
@@ -183,10 +209,11 @@ def generate_actions(
         # 2) lift trailing stop relative to the highest seen
         peak = max(prev_peak, price)
         peak_cache[sym] = peak
-        new_sl = peak * (1 - Decimal(str(TRAIL_PCT)) / 100)
+        new_sl = peak * _TRAIL_KEEP
         if new_sl > pos["sl"]:
             pos["sl"] = new_sl
-            logger.debug("%s trail-stop lifted to %.2f", sym, new_sl)
+            if debug:
+                logger.debug("%s trail-stop lifted to %.2f", sym, new_sl)
 
         # 3) check TP / SL
         if price >= pos["tp"]:
@@ -199,3 +226,68 @@ def generate_actions(
             reasons.append("no-exit-signal")
 
     return actions, reasons
+
+
+def screen_exits(
+    open_positions: Dict[str, dict],
+    peak_cache: Dict[str, Decimal],
+    price_snapshot: Dict[str, float],
+) -> Tuple[List[TradeAction], Dict[str, List[str]]]:
+    """
+    Trailing-stop lift and TP / SL check for every open position at once.
+
+    Same rules as the exit branch of generate_actions, laid out as float64
+    columns (price, peak, sl, tp) so the whole book is one kernel call.
+    Decimal levels are only written back for rows whose peak or stop moved,
+    and TradeActions are only built for rows that exit.
+
+    Returns:
+      - actions: sells to send
+      - reasons: per-symbol rule-names for positions left open
+    """
+    actions: List[TradeAction] = []
+    reasons: Dict[str, List[str]] = {}
+    syms: List[str] = []
+    rows = []
+    for sym, pos in open_positions.items():
+        px = price_snapshot.get(sym)
+        if px is None:
+            reasons[sym] = ["no-price"]
+            continue
+        entry_price = (
+            pos.get("entry") or pos.get("avg_price") or pos.get("blended_price") or px
+        )
+        sl, tp = pos.get("sl"), pos.get("tp")
+        syms.append(sym)
+        rows.append((
+            px,
+            peak_cache.get(sym, entry_price),
+            -math.inf if sl is None else sl,
+            math.inf if tp is None else tp,
+            sym not in peak_cache,
+        ))
+    if not syms:
+        return actions, reasons
+
+    # row-major build, so transpose into contiguous columns for the kernel
+    price, prev_peak, sl, tp, uncached = np.ascontiguousarray(np.array(rows, dtype=np.float64).T)
+    peak, sl, lifted, take, stop = exit_levels(price, prev_peak, sl, tp, _TRAIL_KEEP_F)
+
+    debug = logger.isEnabledFor(logging.DEBUG)
+    for i in np.flatnonzero((peak > prev_peak) | lifted | (uncached > 0)):
+        sym = syms[i]
+        peak_cache[sym] = to_decimal(peak[i])
+        if lifted[i]:
+            open_positions[sym]["sl"] = to_decimal(sl[i])
+            if debug:
+                logger.debug("%s trail-stop lifted to %.2f", sym, sl[i])
+
+    for i, sym in enumerate(syms):
+        if take[i] or stop[i]:
+            tag, label = ("TP", "TAKE-PROFIT") if take[i] else ("SL", "STOP-LOSS")
+            exit_px = to_decimal(price[i])
+            actions.append(TradeAction("sell", sym, open_positions[sym]["amount"], exit_px, tag=tag))
+            logger.info("%s %s hit @ %.2f", sym, label, price[i])
+        else:
+            reasons[sym] = ["no-exit-signal"]
+    return actions, reasons
@@ -1,4 +1,6 @@
 # symbol_map.py
+from config import MODE, SYMBOLS
+
 SPOT_TO_FUT = {
     "BTC/USD":  "PI_XBTUSD",   # inverse perpetual
     "ETH/USD":  "PI_ETHUSD",
@@ -8,9 +10,22 @@ SPOT_TO_FUT = {
     # add the contracts you want
 }
 
-def map_sym(sym: str) -> str:
-    from config import MODE
+
+def _target(sym: str) -> str:
     if MODE == "SIM":
         # return explicit mapping or auto-generate PF_<BASE>USD
         return SPOT_TO_FUT.get(sym, f"PF_{sym.split('/')[0]}USD")
     return sym
+
+
+class _SymMap(dict):
+    # a symbol outside SYMBOLS is worked out on first sight and kept
+    def __missing__(self, sym: str) -> str:
+        self[sym] = target = _target(sym)
+        return target
+
+
+# MODE and the table are fixed for the life of the process: the whole
+# universe is mapped at import, and map_sym is the dict's own C-level lookup
+_MAP = _SymMap((s, _target(s)) for s in SYMBOLS)
+map_sym = _MAP.__getitem__
@@ -0,0 +1,274 @@
+# ws_cache.py
+"""
+Kraken WebSocket v2 market-data cache.
+
+One background thread keeps a single websocket subscribed to ticker, book
+and ohlc (1m + 1h) for every symbol and pushes the updates into in-process
+dicts.  The hot path then reads prices, books and candles from memory
+instead of paying an HTTPS round-trip per symbol per call.
+
+Callers can also register a price band per symbol (set_triggers); a
+ticker leaving its band wakes wait_trigger(), so the trading loop reacts
+to a stop or a dip on the push instead of at the end of its sleep.
+
+A second, authenticated connection listens to balances and executions.
+It does not mirror the balance itself (REST stays the source of truth for
+free/hold amounts); it only bumps `balance_epoch` whenever the account
+changes, so callers can keep reusing their last REST balance until then.
+"""
+import asyncio
+import calendar
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+import websockets
+try:
+    import uvloop
+except ImportError:                      # optional – asyncio's own loop is used instead
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+WS_URL      = "wss://ws.kraken.com/v2"
+WS_AUTH_URL = "wss://ws-auth.kraken.com/v2"
+BOOK_DEPTH  = 10
+OHLC_MAXLEN = 120          # bars kept per symbol / timeframe
+MAX_BACKOFF = 60           # seconds between reconnect attempts (cap)
+
+# ─── CACHES (written by the feed thread, read by everyone else) ───────────
+last_price: dict[str, float] = {}
+books: dict[str, dict] = {}
+ohlc_1m: dict[str, deque] = {}
+ohlc_1h: dict[str, deque] = {}
+
+_levels: dict[str, dict[str, dict[float, float]]] = {}
+_thread: threading.Thread | None = None
+
+# symbol → (low, high); rebound whole by set_triggers, read by the feed
+_triggers: dict[str, tuple[float, float]] = {}
+_triggered = threading.Event()
+
+# private feed: the REST token call is made by the trading thread (Kraken
+# nonces must stay ordered), handed over through _token_q on request
+balance_epoch = 0
+_private_live = False
+_private_thread: threading.Thread | None = None
+_token_wanted = threading.Event()
+_token_q: queue.Queue = queue.Queue(maxsize=1)
+
+
+def _serve(main) -> None:
+    # each feed thread owns its loop; uvloop's libuv/epoll loop keeps the
+    # per-message wakeup cheaper than the default selector loop
+    factory = uvloop.new_event_loop if uvloop is not None else None
+    with asyncio.Runner(loop_factory=factory) as runner:
+        runner.run(main())
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#  PUBLIC API
+# ──────────────────────────────────────────────────────────────────────────
+def start(symbols: list[str]) -> None:
+    """Start the feed thread once; later calls are no-ops."""
+    global _thread
+    if _thread is not None:
+        return
+    syms = list(symbols)
+    _thread = threading.Thread(
+        target=_serve, args=(lambda: _run(syms),),
+        name="kraken-ws", daemon=True,
+    )
+    _thread.start()
+    logger.info("WS feed started for %d symbols", len(syms))
+
+
+def start_private() -> None:
+    """Start the balances/executions feed once; it waits for supply_token()."""
+    global _private_thread
+    if _private_thread is not None:
+        return
+    _private_thread = threading.Thread(
+        target=_serve, args=(_run_private,),
+        name="kraken-ws-auth", daemon=True,
+    )
+    _private_thread.start()
+
+
+def wants_token() -> bool:
+    return _token_wanted.is_set()
+
+
+def supply_token(token: str) -> None:
+    _token_wanted.clear()
+    _token_q.put(token)
+
+
+def private_live() -> bool:
+    """True while the account feed is subscribed and balance_epoch can be trusted."""
+    return _private_live
+
+
+def live() -> bool:
+    """True while the market feed is connected and has delivered tickers."""
+    return bool(last_price)
+
+
+def set_triggers(bands: dict[str, tuple[float, float]]) -> None:
+    """Replace the watched price bands and re-arm wait_trigger()."""
+    global _triggers
+    _triggered.clear()
+    _triggers = bands
+
+
+def wait_trigger(timeout: float) -> bool:
+    """Sleep up to `timeout` s; True if a ticker left its band meanwhile."""
+    return _triggered.wait(timeout)
+
+
+def price(symbol: str) -> float | None:
+    return last_price.get(symbol)
+
+
+def order_book(symbol: str) -> dict | None:
+    book = books.get(symbol)
+    return dict(book) if book is not None else None
+
+
+def candles(symbol: str, timeframe: str, limit: int) -> list | None:
+    """Last `limit` bars in ccxt OHLCV shape, or None if not enough cached yet."""
+    buf = (ohlc_1h if timeframe == "1h" else ohlc_1m).get(symbol)
+    if buf is None or len(buf) < limit:
+        return None
+    # index from the right end: O(limit), not a copy of the whole ring
+    return [buf[i] for i in range(-limit, 0)]
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#  FEED
+# ──────────────────────────────────────────────────────────────────────────
+async def _run(symbols: list[str]) -> None:
+    delay = 1
+    while True:
+        try:
+            async with websockets.connect(WS_URL, ping_interval=20) as ws:
+                await _subscribe(ws, symbols)
+                delay = 1
+                async for raw in ws:
+                    _dispatch(json.loads(raw))
+        except Exception as exc:          # network drop, server restart, …
+            logger.warning("WS feed dropped (%s) – reconnecting in %ds", exc, delay)
+        # nothing below is being updated any more – drop it so readers fall
+        # back to REST until the resubscribe snapshots arrive
+        last_price.clear()
+        books.clear()
+        _levels.clear()
+        ohlc_1m.clear()               # frozen candles would pass for live bars
+        ohlc_1h.clear()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_BACKOFF)
+
+
+async def _subscribe(ws, symbols: list[str]) -> None:
+    subs = [
+        {"channel": "ticker", "symbol": symbols},
+        {"channel": "book",   "symbol": symbols, "depth": BOOK_DEPTH},
+        {"channel": "ohlc",   "symbol": symbols, "interval": 1},
+        {"channel": "ohlc",   "symbol": symbols, "interval": 60},
+    ]
+    for params in subs:
+        await ws.send(json.dumps({"method": "subscribe", "params": params}))
+
+
+async def _next_token() -> str:
+    # polled rather than awaited on a worker thread: a blocked executor
+    # thread would keep the interpreter from exiting
+    while True:
+        try:
+            return _token_q.get_nowait()
+        except queue.Empty:
+            await asyncio.sleep(1)
+
+
+async def _run_private() -> None:
+    global _private_live, balance_epoch
+    delay = 1
+    while True:
+        _token_wanted.set()
+        token = await _next_token()
+        try:
+            async with websockets.connect(WS_AUTH_URL, ping_interval=20) as ws:
+                for params in (
+                    {"channel": "balances", "token": token},
+                    {"channel": "executions", "token": token,
+                     "snap_orders": False, "snap_trades": False},
+                ):
+                    await ws.send(json.dumps({"method": "subscribe", "params": params}))
+                delay = 1
+                async for raw in ws:
+                    msg = json.loads(raw)
+                    if msg.get("channel") in ("balances", "executions") and msg.get("data"):
+                        balance_epoch += 1
+                        if msg["channel"] == "balances":
+                            _private_live = True
+        except Exception as exc:
+            logger.warning("WS account feed dropped (%s) – reconnecting in %ds", exc, delay)
+        _private_live = False
+        balance_epoch += 1
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_BACKOFF)
+
+
+def _dispatch(msg: dict) -> None:
+    channel = msg.get("channel")
+    if channel == "ticker":
+        for row in msg["data"]:
+            if row.get("last") is not None:
+                px = last_price[row["symbol"]] = float(row["last"])
+                band = _triggers.get(row["symbol"])
+                if band is not None and not band[0] < px < band[1]:
+                    _triggered.set()
+    elif channel == "book":
+        for row in msg["data"]:
+            _apply_book(row, snapshot=msg.get("type") == "snapshot")
+    elif channel == "ohlc":
+        for row in msg["data"]:
+            _apply_candle(row)
+
+
+def _apply_book(row: dict, snapshot: bool) -> None:
+    sym = row["symbol"]
+    if snapshot or sym not in _levels:
+        _levels[sym] = {"bids": {}, "asks": {}}
+    lv = _levels[sym]
+    for side in ("bids", "asks"):
+        levels = lv[side]
+        for level in row.get(side, []):
+            if level["qty"] == 0:
+                levels.pop(level["price"], None)
+            else:
+                levels[level["price"]] = level["qty"]
+    bids = sorted(lv["bids"].items(), reverse=True)[:BOOK_DEPTH]
+    asks = sorted(lv["asks"].items())[:BOOK_DEPTH]
+    # drop levels that fell outside the subscribed depth
+    lv["bids"], lv["asks"] = dict(bids), dict(asks)
+    # the sorted (price, qty) pairs are published as they are – readers only
+    # index them, and every update replaces the lists instead of mutating them
+    books[sym] = {"bids": bids, "asks": asks, "timestamp": int(time.time() * 1000)}
+
+
+def _apply_candle(row: dict) -> None:
+    sym = row["symbol"]
+    cache = ohlc_1h if row["interval"] == 60 else ohlc_1m
+    buf = cache.get(sym)
+    if buf is None:
+        buf = cache[sym] = deque(maxlen=OHLC_MAXLEN)
+    ts = calendar.timegm(time.strptime(row["interval_begin"][:19], "%Y-%m-%dT%H:%M:%S")) * 1000
+    bar = [ts, row["open"], row["high"], row["low"], row["close"], row["volume"]]
+    if buf and buf[-1][0] == ts:
+        buf[-1] = bar                     # in-progress bar updated
+    elif not buf or ts > buf[-1][0]:
+        buf.append(bar)